@@ -0,0 +1,449 @@
+"""
+asyncio transport of the HTTP backend.
+
+Django has no asynchronous database backends, its async queryset methods run
+the sync ones in a thread with `sync_to_async`. The async methods of
+`CrateQuerySet` instead send the statement with an `AsyncCursor`, and the ORM
+builds the result from the fetched rows, e.g.
+
+>>> async for metric in Metrics.objects.filter(host="a"):
+...     ...
+>>> await Metrics.objects.acount()
+
+One event loop keeps many queries in flight without a thread per query.
+It requires aiohttp, install it with `pip install cratedb-django[async]`.
+
+Every event loop has its own aiohttp sessions, they are closed when the loop
+shuts down its async generators, e.g. at the end of `asyncio.run`. Loops
+closed without `loop.shutdown_asyncgens()` have to call `close_connections`.
+"""
+
+import asyncio
+import importlib.util
+import json
+import weakref
+from base64 import b64encode
+from collections.abc import Mapping, Sequence
+from itertools import chain
+from typing import Callable, TypeVar
+
+from crate.client.cursor import Cursor
+from crate.client.exceptions import (
+    ConnectionError,
+    IntegrityError,
+    ProgrammingError,
+)
+from crate.client.http import _server_url, json_dumps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, NotSupportedError, connections
+
+from . import instrumentation, timeouts
+from .base import ColumnConverter, CrateDBCursorWrapper
+from .compiler import prefetched_cursor
+
+SQL_PATH = "/_sql?types=true"
+
+T = TypeVar("T")
+
+
+def is_available() -> bool:
+    return importlib.util.find_spec("aiohttp") is not None
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            f"Error loading aiohttp module: {e}, install it with "
+            "`pip install cratedb-django[async]`"
+        ) from e
+    return aiohttp
+
+
+def _raise_for_status(status: int, reason: str, data: dict | None) -> None:
+    """Raises the errors of `crate.client.http`, for a response."""
+    if status < 400:
+        return
+    if data is None:
+        kind = "Client" if status < 500 else "Server"
+        raise ProgrammingError(f"{status} {kind} Error: {reason}")
+
+    error = data.get("error", {})
+    if errors := [
+        result["error_message"]
+        for result in data.get("results", [])
+        if result.get("error_message")
+    ]:
+        raise ProgrammingError("\n".join(errors))
+    message = error.get("message", "") if isinstance(error, dict) else error
+    error_class = (
+        IntegrityError
+        if "DuplicateKeyException" in message
+        else ProgrammingError
+    )
+    raise error_class(message, error_trace=data.get("error_trace"))
+
+
+class AsyncConnection:
+    """
+    A connection to CrateDB's HTTP endpoint with an aiohttp session.
+
+    It takes the parameters of `crate.client.connection.Connection`, the
+    socket options only apply to the sync client and are ignored. `pool_size`
+    limits the concurrent requests to every server.
+    """
+
+    def __init__(
+        self,
+        servers,
+        username=None,
+        password=None,
+        verify_ssl_cert=True,
+        timeout=None,
+        pool_size=None,
+        statement_timeout=None,
+        **kwargs,
+    ):
+        self._aiohttp = _import_aiohttp()
+        if isinstance(servers, str):
+            servers = servers.split()
+        self.servers = [_server_url(server) for server in servers]
+        self._next_server = 0
+        self._headers = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        if username is not None:
+            credentials = f"{username}:{password or ''}".encode()
+            self._headers["Authorization"] = (
+                f"Basic {b64encode(credentials).decode()}"
+            )
+        self._verify_ssl_cert = verify_ssl_cert
+        self._timeout = timeout
+        self._pool_size = pool_size
+        self.statement_timeout = statement_timeout
+        self._session = None
+        self.converter = ColumnConverter()
+
+    def _get_session(self):
+        if self._session is None:
+            aiohttp = self._aiohttp
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=0,
+                    limit_per_host=self._pool_size or 0,
+                    ssl=None if self._verify_ssl_cert else False,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self._timeout),
+                headers=self._headers,
+            )
+        return self._session
+
+    async def sql(self, stmt, parameters=None, bulk_parameters=None) -> dict:
+        """
+        Sends a statement, trying the next server when one cannot be
+        connected to. Once the request was sent, the statement may have run
+        and is not sent again, e.g. on timeouts.
+        """
+        data = {"stmt": stmt}
+        if parameters:
+            data["args"] = parameters
+        if bulk_parameters:
+            data["bulk_args"] = bulk_parameters
+        body = json_dumps(data)
+
+        session = self._get_session()
+        error = None
+        for _ in self.servers:
+            server = self.servers[self._next_server % len(self.servers)]
+            self._next_server += 1
+            try:
+                async with session.post(
+                    server + SQL_PATH, data=body
+                ) as response:
+                    content = await response.read()
+            except self._aiohttp.ClientConnectorError as e:
+                error = e
+                continue
+            except (
+                self._aiohttp.ClientConnectionError,
+                asyncio.TimeoutError,
+            ) as e:
+                raise ConnectionError(
+                    f"Server {server} failed to respond: {e!r}"
+                ) from e
+
+            result = (
+                json.loads(content)
+                if response.content_type == "application/json"
+                else None
+            )
+            _raise_for_status(response.status, response.reason, result)
+            return result
+
+        raise ConnectionError(
+            f"No more Servers available, exception from last server: {error}"
+        )
+
+    async def kill(self, tag: str) -> None:
+        """Kills the jobs of the statements tagged with `tag`."""
+        try:
+            jobs = await self.sql(timeouts.JOBS_SQL, [f"{tag}%"])
+            for (job_id,) in jobs["rows"]:
+                await self.sql(timeouts.kill_sql(job_id))
+        except Exception:
+            timeouts.logger.exception("Failed to kill the statement %s", tag)
+
+    def cursor(self) -> "AsyncCursor":
+        return AsyncCursor(self, self.converter)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncCursor(Cursor):
+    """
+    Cursor of an `AsyncConnection`, `execute` and `executemany` are
+    coroutines, the fetch methods read the rows that were already received.
+
+    Queries and rows are converted like in `CrateDBCursorWrapper`, sharing
+    its query cache.
+    """
+
+    bulk_chunk_size = CrateDBCursorWrapper.bulk_chunk_size
+    _chunks = CrateDBCursorWrapper._chunks
+    convert_query = CrateDBCursorWrapper.convert_query
+    _convert_query = CrateDBCursorWrapper._convert_query
+    _convert_rows = CrateDBCursorWrapper._convert_rows
+    time_zone = CrateDBCursorWrapper.time_zone
+
+    async def execute(self, query, params=None, *, timeout=None) -> None:
+        """
+        Sends the statement, it is killed after `timeout` seconds, which
+        defaults to the `statement_timeout` of the connection.
+        """
+        if params is not None:
+            # Extract names if params is a mapping, i.e. "pyformat" style is used.
+            param_names = list(params) if isinstance(params, Mapping) else None
+            query = self.convert_query(query, param_names=param_names)
+        if timeout is None:
+            timeout = self.connection.statement_timeout
+        if timeout is None:
+            await self._sql(query, params)
+        else:
+            tag = timeouts.new_tag()
+            try:
+                await asyncio.wait_for(
+                    self._sql(f"{tag} {query}", params), timeout
+                )
+            except asyncio.TimeoutError:
+                await self.connection.kill(tag)
+                raise timeouts.timeout_error(timeout, query) from None
+        if "rows" in self._result:
+            self.rows = iter(self._convert_rows())
+
+    async def executemany(self, query, param_list) -> int | list:
+        """
+        Sends the parameters in chunks of `bulk_chunk_size` rows, like
+        `CrateDBCursorMixin.executemany`: the result of every row is only
+        returned for sequences, the total rowcount otherwise.
+        """
+        chunks = self._chunks(param_list)
+        first_chunk = next(chunks, [])
+        params = first_chunk[0] if first_chunk else None
+        param_names = list(params) if isinstance(params, Mapping) else None
+        query = self.convert_query(query, param_names=param_names)
+
+        results = [] if isinstance(param_list, Sequence) else None
+        rowcount = duration = 0
+        for chunk in chain([first_chunk] if first_chunk else [], chunks):
+            await self._sql(query, bulk_parameters=chunk)
+            chunk_results = self._result.get("results", [])
+            if results is not None:
+                results.extend(chunk_results)
+            rowcount += sum(
+                max(r.get("rowcount", -1), 0) for r in chunk_results
+            )
+            duration += max(self.duration, 0)
+
+        self._result = {
+            "rowcount": rowcount,
+            "duration": duration,
+            "rows": [],
+            "cols": [],
+            "col_types": [],
+            "results": results or [],
+        }
+        self.rows = iter([])
+        return rowcount if results is None else results
+
+    async def _sql(self, query, params=None, bulk_parameters=None) -> None:
+        if self._closed:
+            raise ProgrammingError("Cursor closed")
+        if not instrumentation.hooks:
+            self._result = await self.connection.sql(
+                query, params, bulk_parameters
+            )
+            return
+        many = bulk_parameters is not None
+        with instrumentation.instrument(
+            self, query, bulk_parameters if many else params, many=many
+        ):
+            self._result = await self.connection.sql(
+                query, params, bulk_parameters
+            )
+
+
+# The aiohttp sessions are bound to their event loop, so are the connections.
+_connections: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, AsyncConnection]
+] = weakref.WeakKeyDictionary()
+
+
+# Async generators closing the connections of their loop, the loop only
+# keeps weak references to them.
+_closers: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+async def _close_at_shutdown(loop_connections: dict):
+    """
+    Closes the connections once the loop finalizes its async generators,
+    e.g. at the end of `asyncio.run`, while it still runs.
+    """
+    try:
+        yield
+    finally:
+        loop = asyncio.get_running_loop()
+        if _connections.get(loop) is loop_connections:
+            del _connections[loop]
+        _closers.pop(loop, None)
+        for connection in loop_connections.values():
+            await connection.close()
+
+
+def get_connection(using: str = DEFAULT_DB_ALIAS) -> AsyncConnection:
+    """Returns the connection to the database `using` of the running loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _connections:
+        _connections[loop] = {}
+        closer = _close_at_shutdown(_connections[loop])
+        # Runs it to its `yield`, which registers it with the loop's
+        # `shutdown_asyncgens`.
+        try:
+            closer.__anext__().send(None)
+        except StopIteration:
+            pass
+        _closers[loop] = closer
+    loop_connections = _connections[loop]
+    if using not in loop_connections:
+        options = connections[using].settings_dict.get("OPTIONS") or {}
+        loop_connections[using] = AsyncConnection(
+            **connections[using].get_connection_params(),
+            statement_timeout=options.get("statement_timeout"),
+        )
+    return loop_connections[using]
+
+
+async def close_connections() -> None:
+    """
+    Closes the connections of the running loop. They are closed when the
+    loop shuts down its async generators, e.g. at the end of `asyncio.run`,
+    loops closed without `shutdown_asyncgens` have to call it.
+    """
+    loop = asyncio.get_running_loop()
+    _closers.pop(loop, None)
+    loop_connections = _connections.pop(loop, {})
+    for connection in loop_connections.values():
+        await connection.close()
+
+
+class _Captured(Exception):
+    pass
+
+
+class _CaptureCursor:
+    """Records the statement the ORM executes, instead of executing it."""
+
+    sql = params = timeout = None
+    # The tables read by the statement, set by `RefreshDirtyTablesMixin`
+    # when some tables are dirty.
+    read_tables = frozenset()
+
+    def execute(self, sql, params=None):
+        self.sql, self.params = sql, params
+        self.timeout = timeouts.statement_timeout.get()
+        raise _Captured
+
+    def close(self):
+        pass
+
+
+class _ReplayCursor:
+    """Returns the rows of `cursor` for the captured statement."""
+
+    def __init__(self, capture: _CaptureCursor, cursor: AsyncCursor):
+        self._capture = capture
+        self._cursor = cursor
+
+    def execute(self, sql, params=None):
+        if sql != self._capture.sql or params != self._capture.params:
+            raise NotSupportedError(
+                "Only operations that execute a single statement can run "
+                "natively with asyncio."
+            )
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+async def _refresh_dirty_tables(cursor, using, tables) -> None:
+    """
+    Refreshes the dirty tables of the database `using` that are in `tables`,
+    like `DatabaseWrapper.refresh_dirty_tables` but with `cursor`.
+    """
+    dirty_tables = connections[using].dirty_tables
+    dirty = {
+        table: partitions
+        for table, partitions in dirty_tables.items()
+        if table in tables
+    }
+    if not dirty:
+        return
+    sql, params = connections[using].ops.refresh_sql(dirty)
+    await cursor.execute(sql, params or None)
+    for table in dirty:
+        dirty_tables.discard(table)
+
+
+async def run(func: Callable[[], T], using: str = DEFAULT_DB_ALIAS) -> T:
+    """
+    Runs the sync ORM operation `func`, sending its statement with asyncio.
+
+    `func` is called twice: first to compile the statement, which is captured
+    instead of executed, then to build the result from the fetched rows. It
+    must execute at most one statement, e.g. no `prefetch_related`. The dirty
+    tables it reads are refreshed before, on lazy refresh.
+    """
+    capture = _CaptureCursor()
+    token = prefetched_cursor.set(capture)
+    try:
+        # Returns when nothing has to be executed, e.g. on empty results.
+        return func()
+    except _Captured:
+        pass
+    finally:
+        prefetched_cursor.reset(token)
+
+    cursor = get_connection(using).cursor()
+    await _refresh_dirty_tables(cursor, using, capture.read_tables)
+    await cursor.execute(capture.sql, capture.params, timeout=capture.timeout)
+    token = prefetched_cursor.set(_ReplayCursor(capture, cursor))
+    try:
+        return func()
+    finally:
+        prefetched_cursor.reset(token)
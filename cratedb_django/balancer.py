@@ -0,0 +1,292 @@
+"""
+Latency-aware server selection for the crate client.
+
+The crate client sends the requests to the `SERVERS` in turn, and drops a
+failing server for a fixed interval. With the `server_selection = "latency"`
+database option, `LatencyAwareClient` instead keeps a moving average of the
+latency and error rate of every server and sends each request to the better
+of two random healthy servers, weighted by the requests in flight on them.
+
+Failing servers are evicted with an exponential backoff and probed in the
+background, a restored server starts with the latency of the slowest healthy
+one, so it gets its share of requests back progressively.
+"""
+
+import dataclasses
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from crate.client.connection import Connection
+from crate.client.exceptions import ConnectionError
+from crate.client.http import SRV_UNAVAILABLE_STATUSES, Client
+
+logger = logging.getLogger("cratedb_django")
+
+SERVER_SELECTIONS = ("round_robin", "latency")
+
+# OPTIONS of the server selection, they are passed to `connect`.
+SELECTION_OPTIONS = (
+    "server_selection",
+    "latency_decay",
+    "eviction_backoff",
+    "max_eviction_backoff",
+    "probe_interval",
+)
+
+
+@dataclasses.dataclass
+class ServerStats:
+    """Moving estimates and counters of one server."""
+
+    # Moving average of the request latency in seconds, None until the first
+    # response.
+    latency: Optional[float] = None
+    # Moving average of the fraction of failed requests.
+    error_rate: float = 0.0
+    in_flight: int = 0
+    requests: int = 0
+    errors: int = 0
+    # Consecutive failures, the eviction backoff doubles with every one.
+    failures: int = 0
+    evictions: int = 0
+    # `time.monotonic()` until which the server is evicted, None if healthy.
+    evicted_until: Optional[float] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.evicted_until is None
+
+
+class _MeasuredServer:
+    """Proxies a `crate.client.http.Server`, measuring its requests."""
+
+    def __init__(self, server, url: str, client: "LatencyAwareClient"):
+        self._server = server
+        self._url = url
+        self._client = client
+
+    def request(self, *args, **kwargs):
+        self._client._request_started(self._url)
+        start = time.monotonic()
+        try:
+            response = self._server.request(*args, **kwargs)
+        except BaseException:
+            self._client._request_finished(self._url, None)
+            raise
+        latency = time.monotonic() - start
+        self._client._request_finished(
+            self._url,
+            None if response.status in SRV_UNAVAILABLE_STATUSES else latency,
+        )
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._server, name)
+
+
+class LatencyAwareClient(Client):
+    """
+    A `crate.client.http.Client` sending requests to the fastest healthy
+    servers, see the module documentation.
+
+    `latency_decay` is the weight of a new sample in the moving averages,
+    `eviction_backoff` and `max_eviction_backoff` bound the eviction of a
+    failing server in seconds, and evicted servers are probed every
+    `probe_interval` seconds, 0 restores them after their backoff without
+    probing.
+    """
+
+    # A server failing every request looks that many times slower.
+    error_penalty = 10
+
+    def __init__(
+        self,
+        *args,
+        latency_decay: float = 0.2,
+        eviction_backoff: float = 1,
+        max_eviction_backoff: float = 30,
+        probe_interval: float = 1,
+        **kwargs,
+    ):
+        self.latency_decay = latency_decay
+        self.eviction_backoff = eviction_backoff
+        self.max_eviction_backoff = max_eviction_backoff
+        self.probe_interval = probe_interval
+        self._stats: dict[str, ServerStats] = {}
+        self._prober: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _create_server(self, server, **pool_kw):
+        super()._create_server(server, **pool_kw)
+        self._stats.setdefault(server, ServerStats())
+        self.server_pool[server] = _MeasuredServer(
+            self.server_pool[server], server, self
+        )
+
+    def close(self):
+        self._closing.set()
+        super().close()
+
+    def server_stats(self) -> dict[str, ServerStats]:
+        """Returns a copy of the statistics of every server."""
+        with self._lock:
+            return {
+                server: dataclasses.replace(stats)
+                for server, stats in self._stats.items()
+            }
+
+    def _score(self, server: str) -> float:
+        stats = self._stats[server]
+        if stats.latency is None:
+            # Unmeasured servers are tried first, unless they failed.
+            return self.error_penalty * stats.error_rate
+        return (
+            stats.latency
+            * (stats.in_flight + 1)
+            * (1 + self.error_penalty * stats.error_rate)
+        )
+
+    def _get_server(self):
+        with self._lock:
+            if not self.probe_interval:
+                now = time.monotonic()
+                for server in list(self._inactive_servers):
+                    if self._stats[server].evicted_until <= now:
+                        self._restore(server)
+            if not self._active_servers:
+                # Every server is evicted, try the one evicted the shortest.
+                self._restore(
+                    min(
+                        self._inactive_servers,
+                        key=lambda s: self._stats[s].evicted_until,
+                    )
+                )
+            healthy = self._active_servers
+            candidates = (
+                random.sample(healthy, 2) if len(healthy) > 1 else healthy
+            )
+            return min(candidates, key=self._score)
+
+    def _drop_server(self, server, message):
+        with self._lock:
+            self._evict(server, message)
+            if not self._active_servers:
+                raise ConnectionError(
+                    "No more Servers available, exception from last server: "
+                    f"{message}"
+                )
+
+    def _evict(self, server: str, message) -> None:
+        stats = self._stats[server]
+        stats.failures += 1
+        backoff = min(
+            self.eviction_backoff * 2 ** (stats.failures - 1),
+            self.max_eviction_backoff,
+        )
+        stats.evicted_until = time.monotonic() + backoff
+        if server in self._active_servers:
+            self._active_servers.remove(server)
+            self._inactive_servers.append(server)
+            stats.evictions += 1
+            logger.warning(
+                "Evicted server %s for %.1fs: %s", server, backoff, message
+            )
+        self._start_prober()
+
+    def _restore(self, server: str) -> None:
+        stats = self._stats[server]
+        stats.evicted_until = None
+        # Start as the slowest healthy server, not as an unmeasured one that
+        # would get every request at once.
+        latencies = [
+            self._stats[s].latency
+            for s in self._active_servers
+            if self._stats[s].latency is not None
+        ]
+        if latencies:
+            stats.latency = max(latencies)
+        stats.error_rate = 0.0
+        self._inactive_servers.remove(server)
+        self._active_servers.append(server)
+        logger.info("Restored server %s", server)
+
+    def _request_started(self, server: str) -> None:
+        with self._lock:
+            self._stats[server].in_flight += 1
+
+    def _request_finished(self, server: str, latency: Optional[float]) -> None:
+        """Records a request, `latency` is None if it failed."""
+        decay = self.latency_decay
+        with self._lock:
+            stats = self._stats[server]
+            stats.in_flight -= 1
+            stats.requests += 1
+            failed = latency is None
+            stats.error_rate += decay * (failed - stats.error_rate)
+            if failed:
+                stats.errors += 1
+                return
+            stats.failures = 0
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += decay * (latency - stats.latency)
+
+    def _start_prober(self) -> None:
+        if (
+            self.probe_interval
+            and self._prober is None
+            and not self._closing.is_set()
+        ):
+            self._prober = threading.Thread(
+                target=self._probe_loop,
+                name="cratedb-django-prober",
+                daemon=True,
+            )
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while not self._closing.wait(self.probe_interval):
+            with self._lock:
+                now = time.monotonic()
+                due = [
+                    server
+                    for server in self._inactive_servers
+                    if self._stats[server].evicted_until <= now
+                ]
+            for server in due:
+                self._probe(server)
+            with self._lock:
+                if not self._inactive_servers:
+                    self._prober = None
+                    return
+
+    def _probe(self, server: str) -> None:
+        try:
+            self.server_infos(server)
+        except Exception as e:
+            with self._lock:
+                if server in self._inactive_servers:
+                    self._evict(server, f"probe failed: {e}")
+            return
+        with self._lock:
+            if server in self._inactive_servers:
+                self._restore(server)
+
+
+def connect(conn_params: dict) -> Connection:
+    """
+    Returns a connection of the parameters, with a `LatencyAwareClient` if
+    `server_selection` is "latency".
+    """
+    params = dict(conn_params)
+    selection = {
+        key: params.pop(key) for key in SELECTION_OPTIONS if key in params
+    }
+    if selection.pop("server_selection", "round_robin") != "latency":
+        return Connection(**params)
+    return Connection(client=LatencyAwareClient(**params, **selection))
@@ -1,18 +1,28 @@
 import logging
 import re
-from collections.abc import Mapping
-from itertools import tee
-from typing import Optional
-
-from crate.client.converter import DefaultTypeConverter
+import threading
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import Callable, Optional
+
+from crate.client.converter import DataType, DefaultTypeConverter
 from crate.client.cursor import Cursor
-from crate.client.connection import Connection
 
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished
+from django.db import connections
 
 from django.db.backends.base.base import BaseDatabaseWrapper
+from django.utils.asyncio import async_unsafe
 from django.utils.regex_helper import _lazy_re_compile
 
+from . import balancer
+from . import instrumentation
+from . import pool
+from . import timeouts
 from .client import DatabaseClient
 from .creation import DatabaseCreation
 from .features import DatabaseFeatures
@@ -20,6 +30,8 @@ from .introspection import DatabaseIntrospection
 from .operations import DatabaseOperations
 from .schema import DatabaseSchemaEditor
 
+logger = logging.getLogger("cratedb_django")
+
 
 def _get_varchar_column(data):
     if data["max_length"] is None:
@@ -91,6 +103,8 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         "ObjectField": "OBJECT",
         # ArrayField is defined in cratedb.fields.arrays.ArrayField.db_type
         "ArrayField": "",
+        # Defined in cratedb.fields.vector.FloatVectorField.db_type
+        "FloatVectorField": "",
     }
 
     operators = {
@@ -110,6 +124,49 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         "iendswith": "LIKE UPPER(%s)",
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # List where bulk operations append `(obj, result)` pairs while
+        # `collect_bulk_results` is active.
+        self.bulk_results = None
+        # Shared by the cursors of the connection, it keeps the row
+        # conversion of every result shape.
+        self.converter = ColumnConverter()
+        # Tables of models with `auto_refresh = "lazy"` written to since
+        # their last refresh, they are refreshed before they are read.
+        self.dirty_tables = DirtyTables()
+
+    @contextmanager
+    def collect_bulk_results(self):
+        """
+        Collects the per-row results of the bulk operations run inside
+        the block, e.g. the ones of `SQLInsertCompiler.execute_sql`.
+        """
+        previous, self.bulk_results = self.bulk_results, []
+        try:
+            yield self.bulk_results
+        finally:
+            self.bulk_results = previous
+
+    def refresh_dirty_tables(self, tables=None) -> None:
+        """
+        Refreshes the dirty tables with one statement, only the ones in
+        `tables` if given.
+        """
+        tables = self.dirty_tables if tables is None else set(tables)
+        dirty = {
+            table: partitions
+            for table, partitions in self.dirty_tables.items()
+            if table in tables
+        }
+        if not dirty:
+            return
+        sql, params = self.ops.refresh_sql(dirty)
+        with self.cursor() as cursor:
+            cursor.execute(sql, params or None)
+        for table in dirty:
+            self.dirty_tables.discard(table)
+
     def rollback(self):
         return
 
@@ -126,17 +183,24 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             )
 
     def get_connection_params(self):
-        VALID_OPTIONS = {"verify_ssl_cert"}
-
         options: Optional[dict[str, str]] = self.settings_dict.get(
             "OPTIONS", None
         )
         if options:
+            checks = CLIENT_OPTIONS | BACKEND_OPTIONS | SELECTION_OPTIONS
             for key in options:
-                if key not in VALID_OPTIONS:
+                if key not in checks:
                     raise ImproperlyConfigured(
                         f"Unexpected OPTIONS parameter {key}"
                     )
+            check_options(options, checks)
+            # Backend options are consumed by the backend itself, they are not
+            # passed down to the crate client.
+            options = {
+                key: value
+                for key, value in options.items()
+                if key not in BACKEND_OPTIONS
+            }
 
         if self.settings_dict.get("PORT"):
             raise ImproperlyConfigured(
@@ -161,15 +225,376 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         return conn_params
 
     def get_new_connection(self, conn_params):
-        return Connection(**conn_params)
+        options = self.settings_dict.get("OPTIONS") or {}
+        if options.get("shared_connection"):
+            return pool.get_shared_connection(conn_params)
+        return balancer.connect(conn_params)
+
+    @async_unsafe
+    def close(self):
+        # Refresh the dirty tables before the connection goes away, e.g. in
+        # `close_old_connections` at request end.
+        if self.dirty_tables and self.connection is not None:
+            self._refresh_dirty_tables_or_log()
+        super().close()
+
+    def _refresh_dirty_tables_or_log(self) -> None:
+        """
+        Refreshes the dirty tables, logging errors instead of raising them,
+        the tables are then forgotten.
+        """
+        try:
+            self.refresh_dirty_tables()
+        except Exception:
+            # The tables are still refreshed by their refresh interval.
+            logger.exception(
+                "Failed to refresh the tables %s",
+                ", ".join(self.dirty_tables),
+            )
+            self.dirty_tables.clear()
+
+    def _close(self):
+        # A shared connection is used by other threads, it is closed with
+        # `pool.close_shared_connections`.
+        if self.connection is not None and pool.is_shared(self.connection):
+            return
+        return super()._close()
+
+    def pool_stats(self) -> dict[str, "pool.PoolStats"]:
+        """Returns the HTTP connection pool statistics of every server."""
+        self.ensure_connection()
+        return pool.pool_stats(self.connection)
+
+    def server_stats(self) -> dict[str, "balancer.ServerStats"]:
+        """
+        Returns the latency and health statistics of every server, they are
+        only kept with `server_selection = "latency"`.
+        """
+        self.ensure_connection()
+        client = self.connection.client
+        if isinstance(client, balancer.LatencyAwareClient):
+            return client.server_stats()
+        return {}
 
     def create_cursor(self, name=None):
-        return CrateDBCursorWrapper(self.connection, DefaultTypeConverter())
+        return self._create_cursor(self.converter)
+
+    @async_unsafe
+    def raw_cursor(self):
+        """
+        Returns a cursor that does not convert the values, rows are the ones
+        sent by CrateDB, e.g. timestamps are epoch milliseconds.
+        """
+        self.ensure_connection()
+        with self.wrap_database_errors:
+            return self._prepare_cursor(self._create_cursor(converter=None))
+
+    def _create_cursor(self, converter):
+        cursor = CrateDBCursorWrapper(self.connection, converter)
+        options = self.settings_dict.get("OPTIONS") or {}
+        if "bulk_chunk_size" in options:
+            cursor.bulk_chunk_size = options["bulk_chunk_size"]
+        if "statement_timeout" in options:
+            cursor.statement_timeout = options["statement_timeout"]
+        return cursor
+
+
+def refresh_dirty_tables(**kwargs) -> None:
+    """
+    Refreshes the dirty tables of every connection at request end, for the
+    persistent connections that `close_old_connections` keeps open. Errors
+    are logged, so that the other connections are still refreshed.
+    """
+    for conn in connections.all(initialized_only=True):
+        if getattr(conn, "dirty_tables", None):
+            conn._refresh_dirty_tables_or_log()
+
+
+request_finished.connect(refresh_dirty_tables)
 
 
 FORMAT_QMARK_REGEX = _lazy_re_compile(r"(?<!%)%s")
 
 
+def _is_bool(value) -> bool:
+    return isinstance(value, bool)
+
+
+def _is_positive_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _is_positive_int_or_zero(value) -> bool:
+    return _is_positive_int(value) or (
+        value == 0 and not isinstance(value, bool)
+    )
+
+
+def _is_positive_number(value) -> bool:
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and value > 0
+    )
+
+
+def _is_positive_number_or_zero(value) -> bool:
+    return _is_positive_number(value) or (
+        value == 0 and not isinstance(value, bool)
+    )
+
+
+# OPTIONS passed to the crate client, with the check their value has to pass
+# and what is expected, for the error message.
+CLIENT_OPTIONS = {
+    "verify_ssl_cert": (_is_bool, "a boolean"),
+    "pool_size": (_is_positive_int, "a positive integer"),
+    "timeout": (_is_positive_number, "a positive number"),
+    "backoff_factor": (_is_positive_number_or_zero, "a positive number or 0"),
+    "socket_keepalive": (_is_bool, "a boolean"),
+    "socket_tcp_keepidle": (_is_positive_int, "a positive integer"),
+    "socket_tcp_keepintvl": (_is_positive_int, "a positive integer"),
+    "socket_tcp_keepcnt": (_is_positive_int, "a positive integer"),
+}
+
+# OPTIONS of the server selection, see `balancer.LatencyAwareClient`.
+SELECTION_OPTIONS = {
+    "server_selection": (
+        lambda value: value in balancer.SERVER_SELECTIONS,
+        f"one of {balancer.SERVER_SELECTIONS!r}",
+    ),
+    "latency_decay": (
+        lambda value: _is_positive_number(value) and value <= 1,
+        "a number between 0 and 1",
+    ),
+    "eviction_backoff": (_is_positive_number, "a positive number"),
+    "max_eviction_backoff": (_is_positive_number, "a positive number"),
+    "probe_interval": (_is_positive_number_or_zero, "a positive number or 0"),
+}
+
+# OPTIONS that configure the backend and are not passed to the crate client.
+BACKEND_OPTIONS = {
+    "query_cache_size": (_is_positive_int_or_zero, "a positive integer or 0"),
+    "bulk_payload_size": (_is_positive_int, "a positive integer"),
+    "bulk_chunk_size": (_is_positive_int, "a positive integer"),
+    "shared_connection": (_is_bool, "a boolean"),
+    "statement_timeout": (_is_positive_number, "a positive number"),
+}
+
+
+def check_options(options: dict, checks: dict) -> None:
+    """Raises ImproperlyConfigured if an option does not pass its check."""
+    for key, value in options.items():
+        if key not in checks:
+            continue
+        check, expected = checks[key]
+        if not check(value):
+            raise ImproperlyConfigured(
+                f"{key} has to be {expected}, not {value!r}"
+            )
+
+
+class DirtyTables(dict):
+    """
+    Maps the dirty tables to the set of their dirty partitions, or to None
+    when the whole table has to be refreshed.
+    """
+
+    # Above this number of dirty partitions, the whole table is refreshed.
+    max_partitions = 100
+
+    def add(self, table: str, partitions=None) -> None:
+        if partitions is None or (table in self and self[table] is None):
+            self[table] = None
+            return
+        dirty = self.setdefault(table, set())
+        dirty.update(partitions)
+        if len(dirty) > self.max_partitions:
+            self[table] = None
+
+    def discard(self, table: str, partitions=None) -> None:
+        """Marks the table, or only the given partitions of it, clean."""
+        if partitions is None:
+            self.pop(table, None)
+            return
+        dirty = self.get(table)
+        if dirty is not None:
+            dirty.difference_update(partitions)
+            if not dirty:
+                del self[table]
+
+
+class ColumnConverter(DefaultTypeConverter):
+    """
+    A type converter that builds the conversion of every distinct `col_types`
+    once, as a function converting whole rows in place.
+
+    Columns whose values are returned as is, e.g. text or numbers, are
+    skipped, a result without timestamp, ip or array of those columns is not
+    converted at all.
+    """
+
+    # Distinct `col_types` kept, the cache is emptied when it is full.
+    maxsize = 256
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._row_converters: dict[tuple, Optional[Callable]] = {}
+
+    def set(self, type_, converter) -> None:
+        super().set(type_, converter)
+        self._row_converters.clear()
+
+    def needs_conversion(self, type_) -> bool:
+        if isinstance(type_, int):
+            try:
+                return DataType(type_) in self._mappings
+            except ValueError:
+                # Types unknown to the client, e.g. float_vector, are
+                # returned as is.
+                return False
+        return self.needs_conversion(type_[1])
+
+    def get(self, type_):
+        if isinstance(type_, int) and not self.needs_conversion(type_):
+            return self._default
+        return super().get(type_)
+
+    def row_converter(self, col_types: list) -> Optional[Callable]:
+        """
+        Returns the function that converts a row of the given `col_types`,
+        or None if its values need no conversion.
+        """
+        key = _freeze(col_types)
+        try:
+            return self._row_converters[key]
+        except KeyError:
+            pass
+
+        columns = [
+            (i, self.get(type_))
+            for i, type_ in enumerate(col_types)
+            if self.needs_conversion(type_)
+        ]
+        if not columns:
+            convert = None
+        elif len(columns) == 1:
+            ((i, convert_value),) = columns
+
+            def convert(row):
+                row[i] = convert_value(row[i])
+                return row
+        else:
+
+            def convert(row):
+                for i, convert_value in columns:
+                    row[i] = convert_value(row[i])
+                return row
+
+        if len(self._row_converters) >= self.maxsize:
+            self._row_converters.clear()
+        self._row_converters[key] = convert
+        return convert
+
+
+def _freeze(col_types) -> tuple:
+    """Returns nested `col_types` lists as hashable tuples."""
+    return tuple(
+        type_ if isinstance(type_, int) else _freeze(type_)
+        for type_ in col_types
+    )
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def _check_query_cache_size(maxsize) -> None:
+    if not isinstance(maxsize, int) or isinstance(maxsize, bool) or maxsize < 0:
+        raise ImproperlyConfigured(
+            "query_cache_size has to be a positive integer or 0, "
+            f"not {maxsize!r}"
+        )
+
+
+class QueryCache:
+    """
+    A bounded, thread-safe LRU cache of converted queries.
+
+    Keys are `(query, param_names)` and values the query already converted to
+    the "qmark" or "named" style, see `CrateDBCursorWrapper.convert_query`.
+    A `maxsize` of 0 disables caching.
+
+    Without `maxsize`, it is read from the settings on first use: the largest
+    `query_cache_size` option of the databases, or `default_maxsize`.
+    """
+
+    default_maxsize = 1024
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            sizes = []
+            for database in settings.DATABASES.values():
+                options = database.get("OPTIONS") or {}
+                if "query_cache_size" in options:
+                    _check_query_cache_size(options["query_cache_size"])
+                    sizes.append(options["query_cache_size"])
+            self._maxsize = max(sizes, default=self.default_maxsize)
+        return self._maxsize
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            try:
+                value = self._cache[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: str) -> None:
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def resize(self, maxsize: int) -> None:
+        """Sets the size, overriding the `query_cache_size` options."""
+        _check_query_cache_size(maxsize)
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Returns the cache statistics, like `functools.lru_cache`."""
+        with self._lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, len(self._cache)
+            )
+
+
+# Shared by every cursor of the process, whatever their database, its size
+# is the largest `query_cache_size` database option.
+query_cache = QueryCache()
+
+
 def aggressively_refresh():
     """
     Runs a refresh table statement on update statements
@@ -191,8 +616,91 @@ def aggressively_refresh():
     return deco
 
 
+class CrateDBCursorMixin:
+    """
+    Parameter conversion, chunked `executemany` and instrumentation, shared by
+    the cursors of every transport.
+
+    Subclasses implement `convert_query` and `_set_bulk_result`, and are
+    mixed with the cursor class of the driver.
+    """
+
+    # Number of parameter rows sent per bulk request in `executemany`, can be
+    # set with the `bulk_chunk_size` database option.
+    bulk_chunk_size = 10_000
+
+    def execute(self, query, params=None) -> None:
+        if params is not None:
+            # Extract names if params is a mapping, i.e. "pyformat" style is used.
+            param_names = list(params) if isinstance(params, Mapping) else None
+            query = self.convert_query(query, param_names=param_names)
+
+        if not instrumentation.hooks:
+            return self._execute(query, params)
+        with instrumentation.instrument(self, query, params):
+            return self._execute(query, params)
+
+    def _execute(self, query, params) -> None:
+        """Sends the converted query with the driver's cursor."""
+        return super().execute(query, params)
+
+    def executemany(self, query, param_list) -> int | list | None:
+        """
+        Sends the parameters in chunks of `bulk_chunk_size` rows, every chunk
+        is its own bulk request, so generators are never fully materialised.
+
+        Returns the result of every row if the driver reports them. When
+        `param_list` is not a sequence, only the total rowcount is returned,
+        keeping a result per row would grow with the number of rows.
+        """
+        chunks = self._chunks(param_list)
+        first_chunk = next(chunks, [])
+
+        # Extract names if params is a mapping, i.e. "pyformat" style is used.
+        params = first_chunk[0] if first_chunk else None
+        param_names = list(params) if isinstance(params, Mapping) else None
+        query = self.convert_query(query, param_names=param_names)
+
+        results = [] if isinstance(param_list, Sequence) else None
+        rowcount = duration = 0
+        for chunk in chain([first_chunk], chunks):
+            chunk_results = self._executemany_chunk(query, chunk)
+            if chunk_results is None:
+                results = None
+            elif results is not None:
+                results.extend(chunk_results)
+            rowcount += max(self.rowcount, 0)
+            duration += max(self.duration, 0)
+
+        self._set_bulk_result(rowcount, duration, results)
+        return rowcount if results is None else results
+
+    def _chunks(self, param_list):
+        if isinstance(param_list, Sequence):
+            for i in range(0, len(param_list), self.bulk_chunk_size):
+                yield param_list[i : i + self.bulk_chunk_size]
+            return
+
+        iterator = iter(param_list)
+        while chunk := list(islice(iterator, self.bulk_chunk_size)):
+            yield chunk
+
+    def _executemany_chunk(self, query, param_list) -> list | None:
+        if not instrumentation.hooks:
+            return super().executemany(query, param_list)
+        with instrumentation.instrument(self, query, param_list, many=True):
+            return super().executemany(query, param_list)
+
+    def _set_bulk_result(self, rowcount, duration, results) -> None:
+        """Stores the aggregated result of all the chunks of `executemany`."""
+        raise NotImplementedError
+
+    def convert_query(self, query, *, param_names=None) -> str:
+        raise NotImplementedError
+
+
 # Inspired by SQLITE driver
-class CrateDBCursorWrapper(Cursor):
+class CrateDBCursorWrapper(CrateDBCursorMixin, Cursor):
     """
     Django uses the "format" and "pyformat" styles, but CrateDB uses '?' question mark.
 
@@ -204,32 +712,80 @@ class CrateDBCursorWrapper(Cursor):
     In both cases, if you want to use a literal "%s", you'll need to use "%%s".
     """
 
+    # Seconds after which a statement is killed, set with the
+    # `statement_timeout` database option or by `CrateQuerySet.timeout`.
+    statement_timeout: Optional[float] = None
+
     # todo pgdiff
     # @aggressively_refresh()
-    def execute(self, query, params=None) -> None:
-        if params is None:
-            return super().execute(query)
-
-        # Extract names if params is a mapping, i.e. "pyformat" style is used.
-        param_names = list(params) if isinstance(params, Mapping) else None
-        query = self.convert_query(query, param_names=param_names)
-        logging.info(f"sent query: {query}, {params}")
+    def execute(self, query, params=None, bulk_parameters=None) -> None:
+        if bulk_parameters is not None:
+            # Called by `Cursor.executemany`, the query is already converted.
+            return Cursor.execute(self, query, bulk_parameters=bulk_parameters)
         return super().execute(query, params)
 
-    def executemany(self, query, param_list) -> int | list | None:
-        # Extract names if params is a mapping, i.e. "pyformat" style is used.
-        # Peek carefully as a generator can be passed instead of a list/tuple.
-        peekable, param_list = tee(iter(param_list))
-        if (params := next(peekable, None)) and isinstance(params, Mapping):
-            param_names = list(params)
-        else:
-            param_names = None
+    def _execute(self, query, params) -> None:
+        timeout = timeouts.current(self.statement_timeout)
+        if timeout is None:
+            return Cursor.execute(self, query, params)
+        with timeouts.Watchdog(self.connection.client, timeout) as watchdog:
+            try:
+                return Cursor.execute(self, f"{watchdog.tag} {query}", params)
+            except Exception as e:
+                if watchdog.fired:
+                    raise timeouts.timeout_error(timeout, query) from e
+                raise
+
+    @Cursor.time_zone.setter
+    def time_zone(self, tz):
+        # The time zone changes the timestamp conversion, the converter is
+        # shared with the other cursors of the connection.
+        if tz is not None and isinstance(self._converter, ColumnConverter):
+            self._converter = ColumnConverter()
+        Cursor.time_zone.fset(self, tz)
+
+    @property
+    def col_types(self) -> Optional[list]:
+        """CrateDB types of the result columns."""
+        return self._result.get("col_types")
+
+    def fetchall(self):
+        if self.rows is None or self._closed:
+            return super().fetchall()
+        # Much faster than `Cursor.fetchall`, which fetches row by row.
+        return list(self.rows)
+
+    def _convert_rows(self):
+        if not isinstance(self._converter, ColumnConverter):
+            return Cursor._convert_rows(self)
+        rows = self._result["rows"]
+        if not rows:
+            # e.g. DML statements, which have no `col_types`.
+            return rows
+        if not self._result.get("col_types"):
+            raise ValueError(
+                "Unable to apply type conversion without `col_types` "
+                "information"
+            )
+        convert = self._converter.row_converter(self._result["col_types"])
+        if convert is None:
+            return rows
+        return map(convert, rows)
 
-        query = self.convert_query(query, param_names=param_names)
-        logging.info(f"sent query: {query}")
-        return super().executemany(query, param_list)
+    def _set_bulk_result(self, rowcount, duration, results) -> None:
+        self._result["rowcount"] = rowcount
+        self._result["duration"] = duration
+        self._result["results"] = results
 
     def convert_query(self, query, *, param_names=None) -> str:
+        key = (query, tuple(param_names) if param_names is not None else None)
+        converted = query_cache.get(key)
+        if converted is None:
+            converted = self._convert_query(query, param_names=param_names)
+            query_cache.set(key, converted)
+        return converted
+
+    def _convert_query(self, query, *, param_names=None) -> str:
         if param_names is None:
             # Convert from "format" style to "qmark" style.
             # todo pgdiff
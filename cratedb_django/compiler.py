@@ -1,26 +1,336 @@
-from django.db.models.sql.compiler import (
-    SQLCompiler,  # noqa: F401 Import needed for re-imports.
-)
+from contextvars import ContextVar
 
+from django.db import DatabaseError
+from django.db.models.expressions import ColPairs
+from django.db.models.lookups import In
 from django.db.models.sql.compiler import (
+    SQLCompiler,
     SQLInsertCompiler,
     SQLUpdateCompiler,
     SQLAggregateCompiler,
     SQLDeleteCompiler,
 )
 
+from cratedb_django import timeouts
+from cratedb_django.models.partition import partition_columns, partition_of
 
-class SQLInsertCompiler(SQLInsertCompiler):
-    pass
+# Cursor that `execute_sql` uses instead of one of the connection, it is set
+# by `cratedb_django.aio` to run the ORM's code on a result fetched with
+# asyncio.
+prefetched_cursor = ContextVar("prefetched_cursor", default=None)
 
 
-class SQLDeleteCompiler(SQLDeleteCompiler):
-    pass
+class _PrefetchedConnection:
+    """Proxies a DatabaseWrapper, returning a given cursor."""
+
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    chunked_cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class PrefetchedCursorMixin:
+    def execute_sql(self, *args, **kwargs):
+        cursor = prefetched_cursor.get()
+        if cursor is None:
+            return super().execute_sql(*args, **kwargs)
+
+        connection = self.connection
+        self.connection = _PrefetchedConnection(connection, cursor)
+        try:
+            return super().execute_sql(*args, **kwargs)
+        finally:
+            self.connection = connection
+
+
+def query_timeout(query):
+    """
+    Returns the timeout set by `CrateQuerySet.timeout` on `query`, or on
+    its inner query, e.g. for aggregations.
+    """
+    while query is not None:
+        timeout = getattr(query, "statement_timeout", None)
+        if timeout is not None:
+            return timeout
+        query = getattr(query, "inner_query", None)
+    return None
+
+
+class StatementTimeoutMixin:
+    def execute_sql(self, *args, **kwargs):
+        timeout = query_timeout(self.query)
+        if timeout is None:
+            return super().execute_sql(*args, **kwargs)
+        token = timeouts.statement_timeout.set(timeout)
+        try:
+            return super().execute_sql(*args, **kwargs)
+        finally:
+            timeouts.statement_timeout.reset(token)
+
+
+class AnyLookupMixin:
+    """
+    Compiles `__in` lookups of values to `col = ANY(%s)` with one array
+    parameter, instead of `col IN (%s, %s, ...)`, so the statement is the
+    same whatever the number of values.
+    """
+
+    def compile(self, node):
+        if (
+            isinstance(node, In)
+            and node.rhs_is_direct_value()
+            and not isinstance(node.lhs, (ColPairs, tuple))
+        ):
+            if (compiled := in_as_any(self, node)) is not None:
+                return compiled
+        return super().compile(node)
+
+
+def in_as_any(compiler, lookup: In) -> tuple[str, tuple] | None:
+    """
+    Returns the `= ANY(%s)` SQL of an `__in` lookup, None if some values are
+    expressions, which have to be compiled in the list.
+    """
+    # Raises EmptyResultSet when there are no values but NULL.
+    rhs_sql, rhs_params = lookup.process_rhs(compiler, compiler.connection)
+    if rhs_sql != "(%s)" % ", ".join(["%s"] * len(rhs_params)):
+        return None
+    lhs_sql, lhs_params = lookup.process_lhs(compiler, compiler.connection)
+    return f"{lhs_sql} = ANY(%s)", (*lhs_params, list(rhs_params))
+
+
+def mark_dirty(compiler, objs=None) -> None:
+    """
+    Marks the table written to by `compiler` dirty, on lazy refresh. Only
+    the partitions of `objs` are, if they are all known.
+    """
+    opts = compiler.query.get_meta()
+    if getattr(opts, "auto_refresh", False) != "lazy":
+        return
+    partitions = None
+    if objs and partition_columns(opts.model):
+        partitions = {partition_of(obj, compiler.connection) for obj in objs}
+        if None in partitions:
+            partitions = None
+    compiler.connection.dirty_tables.add(opts.db_table, partitions)
+
 
+def read_tables(query) -> set[str]:
+    """Returns the tables read by `query`, the aliases may not be set up."""
+    tables = {
+        table.table_name
+        for table in query.alias_map.values()
+        if table.table_name
+    }
+    if query.model is not None:
+        tables.add(query.get_meta().db_table)
+    if inner_query := getattr(query, "inner_query", None):
+        tables |= read_tables(inner_query)
+    return tables
 
-class SQLUpdateCompiler(SQLUpdateCompiler):
+
+class RefreshDirtyTablesMixin:
+    def execute_sql(self, *args, **kwargs):
+        if self.connection.dirty_tables:
+            tables = read_tables(self.query)
+            cursor = prefetched_cursor.get()
+            if cursor is None:
+                self.connection.refresh_dirty_tables(tables)
+            else:
+                # The sync connection cannot be used with asyncio, `aio.run`
+                # refreshes the tables before sending the statement.
+                cursor.read_tables = tables
+        return super().execute_sql(*args, **kwargs)
+
+
+class SQLCompiler(
+    AnyLookupMixin,
+    RefreshDirtyTablesMixin,
+    StatementTimeoutMixin,
+    PrefetchedCursorMixin,
+    SQLCompiler,
+):
     pass
 
 
-class SQLAggregateCompiler(SQLAggregateCompiler):
+class SQLInsertCompiler(SQLInsertCompiler):
+    def as_bulk_sql(self) -> tuple[str, list] | None:
+        """
+        Returns one parameterised INSERT statement and the parameters of
+        every row, to be sent with CrateDB's `bulk_args`.
+
+        Returns None if the rows cannot share one statement, e.g. when
+        some values are SQL expressions.
+        """
+        if self.returning_fields or not self.query.fields:
+            return None
+
+        qn = self.connection.ops.quote_name
+        opts = self.query.get_meta()
+        fields = self.query.fields
+        value_rows = [
+            [
+                self.prepare_value(field, self.pre_save_val(field, obj))
+                for field in fields
+            ]
+            for obj in self.query.objs
+        ]
+        placeholder_rows, param_rows = self.assemble_as_sql(fields, value_rows)
+        if not placeholder_rows or any(
+            row != placeholder_rows[0] for row in placeholder_rows
+        ):
+            return None
+
+        result = [
+            self.connection.ops.insert_statement(
+                on_conflict=self.query.on_conflict
+            ),
+            qn(opts.db_table),
+            "(%s)" % ", ".join(qn(f.column) for f in fields),
+            "VALUES (%s)" % ", ".join(placeholder_rows[0]),
+        ]
+        on_conflict_suffix_sql = self.connection.ops.on_conflict_suffix_sql(
+            fields,
+            self.query.on_conflict,
+            (f.column for f in self.query.update_fields),
+            (f.column for f in self.query.unique_fields),
+        )
+        if on_conflict_suffix_sql:
+            result.append(on_conflict_suffix_sql)
+        return " ".join(result), param_rows
+
+    def execute_sql(self, returning_fields=None):
+        mark_dirty(self, self.query.objs)
+        self.returning_fields = returning_fields
+        collect = self.connection.bulk_results is not None
+        # A single row is inserted without bulk_args, unless results are
+        # collected, so failures raise the driver's error.
+        bulk = (
+            self.as_bulk_sql() if collect or len(self.query.objs) > 1 else None
+        )
+        if bulk is None:
+            rows = super().execute_sql(returning_fields)
+            if collect:
+                # Without bulk_args, a failure raises an error.
+                self.connection.bulk_results.extend(
+                    (obj, {"rowcount": 1}) for obj in self.query.objs
+                )
+            return rows
+
+        sql, param_rows = bulk
+        with self.connection.cursor() as cursor:
+            results = cursor.executemany(sql, param_rows)
+        if not isinstance(results, list):
+            # Some drivers only report the total rowcount, and raise if a
+            # row fails.
+            results = [{}] * len(param_rows)
+        if collect:
+            self.connection.bulk_results.extend(zip(self.query.objs, results))
+        elif failed := sum(r.get("rowcount") == -2 for r in results):
+            raise DatabaseError(
+                f"{failed} of {len(results)} rows failed to be inserted "
+                f"into {self.query.get_meta().db_table}"
+            )
+        return []
+
+
+class SQLDeleteCompiler(
+    AnyLookupMixin, StatementTimeoutMixin, SQLDeleteCompiler
+):
+    def execute_sql(self, *args, **kwargs):
+        mark_dirty(self)
+        return super().execute_sql(*args, **kwargs)
+
+
+class SQLUpdateCompiler(
+    AnyLookupMixin, StatementTimeoutMixin, SQLUpdateCompiler
+):
+    def execute_sql(self, *args, **kwargs):
+        mark_dirty(self)
+        return super().execute_sql(*args, **kwargs)
+
+    def as_bulk_sql(self, objs, fields) -> tuple[str, list] | None:
+        """
+        Returns one parameterised UPDATE statement setting `fields` by
+        primary key, and the parameters of every object, to be sent with
+        CrateDB's `bulk_args`.
+
+        Returns None if the rows cannot share one statement, e.g. when
+        some values are SQL expressions.
+        """
+        opts = self.query.get_meta()
+        if len(opts.pk_fields) > 1 or any(
+            hasattr(field, "get_placeholder") for field in fields
+        ):
+            return None
+
+        param_rows = []
+        for obj in objs:
+            values = [getattr(obj, field.attname) for field in fields]
+            if any(hasattr(value, "resolve_expression") for value in values):
+                return None
+            param_rows.append(
+                [
+                    field.get_db_prep_save(value, connection=self.connection)
+                    for field, value in zip(fields, values)
+                ]
+                + [opts.pk.get_db_prep_value(obj.pk, self.connection)]
+            )
+
+        qn = self.connection.ops.quote_name
+        sql = "UPDATE %s SET %s WHERE %s = %%s" % (
+            qn(opts.db_table),
+            ", ".join(f"{qn(field.column)} = %s" for field in fields),
+            qn(opts.pk.column),
+        )
+        return sql, param_rows
+
+    def execute_bulk(self, objs, fields, batch_size=None) -> tuple | None:
+        """
+        Updates `fields` of every object with `as_bulk_sql`, sending
+        `batch_size` rows per request if given.
+
+        Returns the number of updated rows and the result of every row, or
+        None if the rows cannot be updated with one statement.
+        """
+        if (statement := self.as_bulk_sql(objs, fields)) is None:
+            return None
+        # Rows only stay in their partition if no partition field is set.
+        partition_fields = set(partition_columns(self.query.model))
+        mark_dirty(
+            self,
+            None if partition_fields & {f.name for f in fields} else objs,
+        )
+
+        sql, param_rows = statement
+        batch_size = batch_size or len(param_rows)
+        rowcount, results = 0, []
+        with self.connection.cursor() as cursor:
+            for i in range(0, len(param_rows), batch_size):
+                batch = param_rows[i : i + batch_size]
+                batch_results = cursor.executemany(sql, batch)
+                rowcount += max(cursor.rowcount, 0)
+                # Some drivers only report the total rowcount.
+                results.extend(
+                    batch_results
+                    if isinstance(batch_results, list)
+                    else [{}] * len(batch)
+                )
+        return rowcount, results
+
+
+class SQLAggregateCompiler(
+    AnyLookupMixin,
+    RefreshDirtyTablesMixin,
+    StatementTimeoutMixin,
+    PrefetchedCursorMixin,
+    SQLAggregateCompiler,
+):
     pass
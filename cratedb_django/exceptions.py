@@ -0,0 +1,8 @@
+from django.db import OperationalError
+
+
+class QueryTimeout(OperationalError):
+    """
+    A statement ran longer than its timeout, see `CrateQuerySet.timeout` and
+    the `statement_timeout` database option. It was killed on the cluster.
+    """
@@ -12,6 +12,17 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     supports_foreign_keys = False
     supports_comments = False
 
+    # The HTTP endpoint returns the whole result set at once, see
+    # `CrateQuerySet.iterator` for chunked reads.
+    can_use_chunked_reads = False
+
+    # Async queryset methods of `CrateQuerySet` send their statement with
+    # `cratedb_django.aio` instead of a thread.
+    has_native_async = True
+
+    # Statements can be killed after a timeout, see `CrateQuerySet.timeout`.
+    supports_statement_timeout = True
+
     can_rollback_ddl = False
     can_return_columns_from_insert = True
 
@@ -6,6 +6,7 @@ from django.db.models.fields.generated import GeneratedField
 from .base import CrateDBBaseField
 from .json import ObjectField
 from .array import ArrayField
+from .vector import FloatVectorField
 from .uuid import AutoUUIDField
 
 
@@ -142,6 +143,7 @@ class UUIDField(CrateDBBaseField, fields.UUIDField):
 __all__ = [
     "ObjectField",
     "ArrayField",
+    "FloatVectorField",
     "AutoField",
     "BigAutoField",
     "BigIntegerField",
@@ -1,25 +1,71 @@
+import re
+
 from django.db.models import Field
 
+from .lookups import Match
+
+# Analyzer names are written in the DDL, they cannot be parameters.
+_ANALYZER_NAME = re.compile(r"\w+")
+
+
+def fulltext_options_sql(analyzer) -> str:
+    """
+    Returns the WITH clause of a fulltext index with `analyzer`, none for
+    the standard analyzer if it is True.
+    """
+    if analyzer is True:
+        return ""
+    if not isinstance(analyzer, str) or not _ANALYZER_NAME.fullmatch(analyzer):
+        raise ValueError(f"Invalid fulltext analyzer {analyzer!r}.")
+    return f" WITH (analyzer = '{analyzer}')"
+
 
 class CrateDBBaseField(Field):
     """
     Base field for CrateDB columns, it implements crate specific
     column options.
+
+    `fulltext=True` indexes the column with a fulltext index for the
+    `match` lookup, with the standard analyzer, or with the analyzer named
+    by it, e.g. `fulltext="english"`.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, fulltext=False, **kwargs):
         super().__init__(*args, **kwargs)
         # Defaults to True because by default CrateDB indexes everything.
         # On `True` we do not modify the syntax.
         self.db_index = kwargs.get("db_index", True)
+        if fulltext:
+            fulltext_options_sql(fulltext)
+        self.fulltext = fulltext
+
+    def _column_options_sql(self) -> str:
+        if not self.db_index:
+            return " INDEX OFF"
+        if self.fulltext:
+            options = fulltext_options_sql(self.fulltext)
+            return f" INDEX USING FULLTEXT{options}"
+        return ""
 
     def db_type(self, connection):
         base_type = super().db_type(connection)
-        if not self.db_index:
-            return f"{base_type} INDEX OFF"
-        return base_type
+        if base_type is None:
+            return None
+        return base_type + self._column_options_sql()
+
+    def cast_db_type(self, connection):
+        # The type alone, without the column options of `db_type`.
+        db_type = super().cast_db_type(connection)
+        if db_type is None:
+            return None
+        return db_type.removesuffix(self._column_options_sql())
 
     def deconstruct(self):
         name, path, args, kwargs = super().deconstruct()
         kwargs["db_index"] = self.db_index
+        if self.fulltext:
+            kwargs["fulltext"] = self.fulltext
         return name, path, args, kwargs
+
+
+CrateDBBaseField.register_lookup(Match)
@@ -4,6 +4,8 @@ from typing import Literal
 from typing import Optional
 
 
+from django.db.models import Field, Transform
+
 from cratedb_django.fields import CrateDBBaseField
 from cratedb_django.fields import JSONField
 
@@ -14,6 +16,46 @@ class ObjectPolicy(StrEnum):
     ignored = auto()
 
 
+class ObjectKeyField(Field):
+    """
+    Output field of the keys of objects without a declared type, values
+    are compared as they are and further keys are transforms, e.g.
+    `payload__device__id`.
+    """
+
+    def get_transform(self, name):
+        return super().get_transform(name) or ObjectKeyTransformFactory(name)
+
+
+class ObjectKeyTransform(Transform):
+    """
+    A key of an object column, it is a sub-column of the table, e.g.
+    `"payload"['device']['id']`, filtered with its index.
+    """
+
+    def __init__(self, key_name, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_name = str(key_name)
+
+    def as_sql(self, compiler, connection):
+        lhs, params = compiler.compile(self.lhs)
+        # Sub-columns are only resolved with literal keys, "%" is escaped
+        # from the parameter placeholders.
+        key = self.key_name.replace("'", "''").replace("%", "%%")
+        return f"{lhs}['{key}']", params
+
+
+class ObjectKeyTransformFactory:
+    def __init__(self, key_name, output_field=None):
+        self.key_name = key_name
+        self.output_field = output_field or ObjectKeyField()
+
+    def __call__(self, *args, **kwargs):
+        return ObjectKeyTransform(
+            self.key_name, *args, output_field=self.output_field, **kwargs
+        )
+
+
 class ObjectField(JSONField):
     crate_type = "OBJECT"
 
@@ -55,5 +97,19 @@ class ObjectField(JSONField):
     def from_db_value(self, value, expression, connection):
         return value
 
+    def get_transform(self, name):
+        # Django's key transforms use the JSON operators of other databases.
+        transform = Field.get_transform(self, name)
+        if transform is not None:
+            return transform
+        return ObjectKeyTransformFactory(name, self._key_field(name))
+
+    def _key_field(self, name) -> Optional[Field]:
+        """Returns the field of the key `name` declared in the schema."""
+        field = (self.schema or {}).get(name)
+        if isinstance(field, dict):
+            return ObjectField(policy=self.policy, schema=field)
+        return field
+
     def get_internal_type(self):
         return "ObjectField"
@@ -0,0 +1,20 @@
+from django.db.models import Lookup
+
+
+class Match(Lookup):
+    """
+    Matches the fulltext index of the column with a query string, e.g.
+    `filter(title__match="quick fox")`, see `functions.Match` for the
+    options of the match.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/dql/fulltext.html#match-predicate
+    """
+
+    lookup_name = "match"
+    # The query string is not a value of the field.
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"MATCH({lhs_sql}, {rhs_sql})", (*lhs_params, *rhs_params)
@@ -0,0 +1,34 @@
+from cratedb_django.fields import CrateDBBaseField
+
+
+class FloatVectorField(CrateDBBaseField):
+    """
+    A `FLOAT_VECTOR(dimensions)` column, indexed by CrateDB for nearest
+    neighbour search, see `functions.KnnMatch` and
+    `functions.VectorSimilarity`.
+
+    Examples
+    --------
+    >>> FloatVectorField(dimensions=384)
+    """
+
+    def __init__(self, dimensions: int, **kwargs):
+        if not isinstance(dimensions, int) or dimensions <= 0:
+            raise ValueError("dimensions has to be a positive integer.")
+        self.dimensions = dimensions
+        super().__init__(**kwargs)
+
+    def db_type(self, connection):
+        return f"FLOAT_VECTOR({self.dimensions})"
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None:
+            return None
+        # e.g. NumPy arrays, which cannot be serialized.
+        return [float(item) for item in value]
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["dimensions"] = self.dimensions
+        return name, path, args, kwargs
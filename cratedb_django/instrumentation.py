@@ -0,0 +1,181 @@
+"""
+Query instrumentation.
+
+Hooks are callables that receive a `QueryEvent` after every statement sent by
+`CrateDBCursorWrapper`, e.g.
+
+>>> from cratedb_django import instrumentation
+>>> histogram = instrumentation.LatencyHistogram()
+>>> instrumentation.register(histogram)
+>>> instrumentation.register(instrumentation.SlowQueryLog(threshold_ms=500))
+
+When no hook is registered, queries are sent without building any event.
+"""
+
+import bisect
+import dataclasses
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+from crate.client.http import json_dumps
+
+logger = logging.getLogger("cratedb_django")
+
+hooks: list[Callable[["QueryEvent"], None]] = []
+
+
+def register(hook: Callable[["QueryEvent"], None]) -> None:
+    """Registers a hook, registering the same hook twice is a no-op."""
+    if hook not in hooks:
+        hooks.append(hook)
+
+
+def unregister(hook: Callable[["QueryEvent"], None]) -> None:
+    if hook in hooks:
+        hooks.remove(hook)
+
+
+@dataclasses.dataclass
+class QueryEvent:
+    """Represents a statement that was sent to CrateDB."""
+
+    sql: str
+    params: Any = dataclasses.field(repr=False)
+    # Number of parameters, or number of parameter rows on bulk operations.
+    param_count: int
+    # Client side time in seconds, including the HTTP round trip.
+    wall_time: float
+    rowcount: int
+    # Server side duration in milliseconds as reported by CrateDB, -1 if
+    # unknown.
+    duration: float
+    many: bool = False
+    error: Optional[BaseException] = None
+
+    @functools.cached_property
+    def payload_bytes(self) -> int:
+        """Size of the JSON payload, it is only computed when accessed."""
+        data = {"stmt": self.sql}
+        if self.params is not None:
+            data["bulk_args" if self.many else "args"] = self.params
+        return len(json_dumps(data))
+
+
+def emit(event: QueryEvent) -> None:
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("Instrumentation hook %r failed", hook)
+
+
+@contextmanager
+def instrument(cursor, sql: str, params, many: bool = False):
+    """Measures the statement run inside the block and emits its event."""
+    error = None
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        wall_time = time.perf_counter() - start
+        emit(
+            QueryEvent(
+                sql=sql,
+                params=params,
+                param_count=len(params) if params is not None else 0,
+                wall_time=wall_time,
+                rowcount=cursor.rowcount,
+                duration=cursor.duration,
+                many=many,
+                error=error,
+            )
+        )
+
+
+class LatencyHistogram:
+    """
+    A hook that counts queries in latency buckets (milliseconds of wall time).
+    """
+
+    DEFAULT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def __call__(self, event: QueryEvent) -> None:
+        ms = event.wall_time * 1000
+        with self._lock:
+            # The last count is for queries slower than the biggest bucket.
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.sum += ms
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.count = 0
+            self.sum = 0.0
+
+    def snapshot(self) -> dict[float, int]:
+        """Returns the cumulative count of queries for every bucket upper bound."""
+        with self._lock:
+            cumulative, total = {}, 0
+            for bound, count in zip((*self.buckets, float("inf")), self.counts):
+                total += count
+                cumulative[bound] = total
+            return cumulative
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Returns the upper bound of the bucket the given fraction (0..1)
+        of queries falls in.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        for bound, total in self.snapshot().items():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class SlowQueryLog:
+    """
+    A hook that logs queries slower than `threshold_ms`, only a `sample_rate`
+    fraction of the slow queries is logged.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 1000,
+        sample_rate: float = 1.0,
+        logger: logging.Logger = logger,
+    ):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.logger = logger
+
+    def __call__(self, event: QueryEvent) -> None:
+        ms = event.wall_time * 1000
+        if ms < self.threshold_ms:
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        self.logger.warning(
+            "Slow query (%.1f ms, server %s ms, %s params, rowcount %s): %s",
+            ms,
+            event.duration,
+            event.param_count,
+            event.rowcount,
+            event.sql,
+        )
@@ -1,3 +1,13 @@
+from .copy import CopyFileReport, CopyFromReport, CopyToReport
 from .model import CrateModel
+from .query import BulkReport, CrateManager, CrateQuerySet
 
-__all__ = ["CrateModel"]
+__all__ = [
+    "CrateModel",
+    "CrateManager",
+    "CrateQuerySet",
+    "BulkReport",
+    "CopyFileReport",
+    "CopyFromReport",
+    "CopyToReport",
+]
@@ -0,0 +1,199 @@
+"""
+Columnar export of querysets, see `CrateQuerySet.to_arrow`, `to_numpy` and
+`to_pandas`.
+
+The compiled SQL is sent with a raw cursor and the rows of the response are
+transposed into columns, without creating a model instance or tuple per row.
+pyarrow, numpy and pandas are imported by the export that needs them, they
+are installed with the `arrow`, `numpy` and `pandas` extras, e.g.
+`pip install cratedb-django[pandas]`.
+"""
+
+import dataclasses
+import importlib
+from typing import Any, Optional
+
+from django.core.exceptions import EmptyResultSet, ImproperlyConfigured
+from django.db import connections
+
+# Kind of the values CrateDB returns for the internal type of a field.
+# Timestamps and dates are returned as epoch milliseconds.
+FIELD_KINDS = {
+    "AutoUUIDField": "string",
+    "BigIntegerField": "int64",
+    "BooleanField": "bool",
+    "CharField": "string",
+    "DateField": "date",
+    "DateTimeField": "timestamp",
+    "EmailField": "string",
+    "FloatField": "float64",
+    "GenericIPAddressField": "string",
+    "IntegerField": "int32",
+    "PositiveBigIntegerField": "int64",
+    "PositiveIntegerField": "int32",
+    "PositiveSmallIntegerField": "int16",
+    "SlugField": "string",
+    "SmallIntegerField": "int16",
+    "TextField": "string",
+    "URLField": "string",
+    "UUIDField": "string",
+}
+
+ARROW_TYPES = {
+    "int16": lambda pa: pa.int16(),
+    "int32": lambda pa: pa.int32(),
+    "int64": lambda pa: pa.int64(),
+    "float64": lambda pa: pa.float64(),
+    "bool": lambda pa: pa.bool_(),
+    "string": lambda pa: pa.string(),
+    "timestamp": lambda pa: pa.timestamp("ms", tz="UTC"),
+    "date": lambda pa: pa.date64(),
+}
+
+NUMPY_DTYPES = {
+    "int16": "int16",
+    "int32": "int32",
+    "int64": "int64",
+    "float64": "float64",
+    "bool": "bool",
+    "timestamp": "datetime64[ms]",
+    "date": "datetime64[ms]",
+}
+
+PANDAS_DTYPES = {
+    "int16": "Int16",
+    "int32": "Int32",
+    "int64": "Int64",
+    "float64": "float64",
+    "bool": "boolean",
+    "string": "string",
+}
+
+
+@dataclasses.dataclass
+class Columns:
+    """The result of a query, as one tuple of values per column."""
+
+    names: list[str]
+    # Kind of the values of every column, None if it is unknown, e.g. for
+    # objects and arrays.
+    kinds: list[Optional[str]]
+    col_types: list
+    values: list[tuple]
+
+    @property
+    def rowcount(self) -> int:
+        return len(self.values[0]) if self.values else 0
+
+    def last_value(self, name: str, converter) -> Any:
+        """
+        Returns the value of `name` in the last row, converted to a Python
+        value with the given `crate.client.converter.Converter`.
+        """
+        try:
+            index = self.names.index(name)
+        except ValueError:
+            raise ValueError(
+                f"{name!r} has to be selected to export in chunks by it."
+            ) from None
+        value = self.values[index][-1]
+        if self.col_types:
+            value = converter.get(self.col_types[index])(value)
+        return value
+
+
+def _field_kind(expression) -> Optional[str]:
+    try:
+        field = expression.output_field
+    except Exception:
+        # e.g. expressions mixing types without an output_field.
+        return None
+    return FIELD_KINDS.get(field.get_internal_type())
+
+
+def fetch_columns(queryset) -> Columns:
+    """Runs the SQL of `queryset` and returns its result in columns."""
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+        if not sql:
+            raise EmptyResultSet
+    except EmptyResultSet:
+        sql = None
+
+    names = [
+        alias or expression.target.attname
+        for expression, _, alias in compiler.select
+    ]
+    kinds = [_field_kind(expression) for expression, _, _ in compiler.select]
+    if sql is None:
+        return Columns(names, kinds, [], [() for _ in names])
+
+    connection = connections[queryset.db]
+    if connection.dirty_tables:
+        from cratedb_django.compiler import read_tables
+
+        connection.refresh_dirty_tables(read_tables(queryset.query))
+    with connection.raw_cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        col_types = cursor.col_types or []
+    values = list(zip(*rows)) if rows else [() for _ in names]
+    return Columns(names, kinds, col_types, values)
+
+
+def _import(module: str, extra: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImproperlyConfigured(
+            f"Error loading {module} module: {e}, install it with "
+            f"`pip install cratedb-django[{extra}]`"
+        ) from e
+
+
+def to_arrow(columns: Columns):
+    pa = _import("pyarrow", "arrow")
+
+    arrays = [
+        pa.array(values, type=ARROW_TYPES[kind](pa) if kind else None)
+        for kind, values in zip(columns.kinds, columns.values)
+    ]
+    return pa.Table.from_arrays(arrays, names=columns.names)
+
+
+def to_numpy(columns: Columns) -> dict:
+    np = _import("numpy", "numpy")
+
+    arrays = {}
+    for name, kind, values in zip(columns.names, columns.kinds, columns.values):
+        dtype = NUMPY_DTYPES.get(kind, object)
+        if None in values and kind in ("int16", "int32", "int64"):
+            # NULLs are NaN, like in pandas.
+            dtype = "float64"
+        elif None in values and kind == "bool":
+            dtype = object
+        array = np.array(values, dtype=dtype)
+        if kind == "date":
+            array = array.astype("datetime64[D]")
+        arrays[name] = array
+    return arrays
+
+
+def to_pandas(columns: Columns):
+    pd = _import("pandas", "pandas")
+
+    data = {}
+    for name, kind, values in zip(columns.names, columns.kinds, columns.values):
+        if kind in ("timestamp", "date"):
+            series = pd.to_datetime(pd.Series(values, dtype="Int64"), unit="ms")
+            data[name] = (
+                series.dt.tz_localize("UTC")
+                if kind == "timestamp"
+                else series.dt.normalize()
+            )
+        else:
+            data[name] = pd.Series(
+                values, dtype=PANDAS_DTYPES.get(kind, object)
+            )
+    return pd.DataFrame(data, columns=columns.names)
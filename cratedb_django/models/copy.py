@@ -0,0 +1,239 @@
+"""
+COPY FROM and COPY TO statements of `CrateModel`, CrateDB imports and exports
+the files itself instead of every row being sent through Python and HTTP.
+"""
+
+import dataclasses
+import os
+import re
+from typing import Any, Optional
+
+from django.core.exceptions import EmptyResultSet, FullResultSet
+from django.db import NotSupportedError
+from django.db.models.expressions import Col
+
+from .partition import partition_key, partition_sql
+
+# Options of the WITH clause of COPY FROM.
+COPY_FROM_OPTIONS = {
+    "bulk_size",
+    "compression",
+    "delimiter",
+    "empty_string_as_null",
+    "fail_fast",
+    "format",
+    "header",
+    "key",
+    "node_filters",
+    "num_readers",
+    "overwrite_duplicates",
+    "protocol",
+    "secret",
+    "shared",
+    "skip",
+    "wait_for_completion",
+}
+
+COPY_FORMATS = ("json", "csv")
+
+# Options of the WITH clause of COPY TO.
+COPY_TO_OPTIONS = {
+    "compression",
+    "format",
+    "key",
+    "protocol",
+    "secret",
+    "wait_for_completion",
+}
+
+COPY_TO_FORMATS = ("json_object", "json_array")
+
+_URI_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+
+
+@dataclasses.dataclass
+class CopyFileReport:
+    """The `RETURN SUMMARY` row of one imported file."""
+
+    uri: str
+    # The node that imported the file, with its "id" and "name".
+    node: dict
+    success_count: Optional[int]
+    error_count: Optional[int]
+    # Error message -> {"count": ..., "line_numbers": [...]}.
+    errors: dict
+
+    @property
+    def ok(self) -> bool:
+        return not self.error_count and not self.errors
+
+
+@dataclasses.dataclass
+class CopyFromReport:
+    """Result of `CrateModel.copy_from`, one report per imported file."""
+
+    files: list[CopyFileReport]
+
+    @property
+    def success_count(self) -> int:
+        return sum(file.success_count or 0 for file in self.files)
+
+    @property
+    def error_count(self) -> int:
+        return sum(file.error_count or 0 for file in self.files)
+
+    @property
+    def failed(self) -> list[CopyFileReport]:
+        return [file for file in self.files if not file.ok]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def source_uri(source) -> str:
+    """
+    Returns the URI of a source, paths are made `file://` URIs.
+
+    Files are read by the CrateDB nodes, paths are local to every node and
+    have to be absolute: the working directory of Django is not the one
+    of the nodes.
+    """
+    source = os.fspath(source)
+    if _URI_SCHEME.match(source):
+        return source
+    if not os.path.isabs(source):
+        raise ValueError(
+            f"{source!r} is not an absolute path, paths are read on the "
+            "CrateDB nodes."
+        )
+    return "file://" + source
+
+
+def copy_from_sql(
+    model,
+    source,
+    connection,
+    *,
+    columns: Optional[list[str]] = None,
+    partition: Optional[dict] = None,
+    **options: Any,
+) -> tuple[str, list]:
+    _check_options(options, COPY_FROM_OPTIONS, COPY_FORMATS, "COPY FROM")
+
+    quote_name = connection.ops.quote_name
+    sql, params = [f"COPY {quote_name(model._meta.db_table)}"], []
+    if partition:
+        partition_clause, partition_params = partition_sql(
+            partition_key(model, partition, connection), quote_name
+        )
+        sql.append(partition_clause)
+        params.extend(partition_params)
+    if columns:
+        names = [model._meta.get_field(name).column for name in columns]
+        sql.append(f"({', '.join(quote_name(name) for name in names)})")
+
+    if isinstance(source, (list, tuple)):
+        params.append([source_uri(s) for s in source])
+    else:
+        params.append(source_uri(source))
+    sql.append("FROM %s")
+
+    if options:
+        sql.append("WITH (%s)" % ", ".join(f"{key} = %s" for key in options))
+        params.extend(options.values())
+    sql.append("RETURN SUMMARY")
+    return " ".join(sql), params
+
+
+def copy_from_report(cursor) -> CopyFromReport:
+    names = [column[0] for column in cursor.description]
+    files = []
+    for row in cursor.fetchall():
+        summary = dict(zip(names, row))
+        files.append(
+            CopyFileReport(
+                uri=summary.get("uri"),
+                node=summary.get("node") or {},
+                success_count=summary.get("success_count"),
+                error_count=summary.get("error_count"),
+                errors=summary.get("errors") or {},
+            )
+        )
+    return CopyFromReport(files)
+
+
+@dataclasses.dataclass
+class CopyToReport:
+    """
+    Result of `CrateQuerySet.copy_to`.
+
+    CrateDB only reports the total number of exported rows, every shard
+    writes its own file in the directory.
+    """
+
+    uri: str
+    rowcount: int
+
+
+def _check_options(options: dict, allowed: set, formats: tuple, statement):
+    for key in options:
+        if key not in allowed:
+            raise ValueError(f"Unexpected {statement} option {key!r}.")
+    if "format" in options and options["format"] not in formats:
+        raise ValueError(
+            f"format has to be one of {formats!r}, not {options['format']!r}."
+        )
+
+
+def copy_to_sql(queryset, uri: str, **options: Any) -> Optional[tuple]:
+    """
+    Returns the COPY TO statement exporting the rows and columns selected
+    by `queryset`, or None if it selects nothing. Like in `source_uri`,
+    `uri` can be an absolute path local to every node.
+    """
+    _check_options(options, COPY_TO_OPTIONS, COPY_TO_FORMATS, "COPY TO")
+    uri = source_uri(uri)
+    query = queryset.query
+    if query.is_sliced or query.distinct or query.combinator:
+        raise NotSupportedError(
+            "COPY TO cannot export sliced, distinct or combined querysets."
+        )
+    if query.group_by is not None or query.annotation_select:
+        raise NotSupportedError("COPY TO cannot export annotations.")
+
+    compiler = query.get_compiler(using=queryset.db)
+    compiler.pre_sql_setup()
+    if len([a for a, count in query.alias_refcount.items() if count]) > 1:
+        raise NotSupportedError("COPY TO cannot export joined tables.")
+
+    opts = query.get_meta()
+    quote_name = compiler.connection.ops.quote_name
+    sql, params = [f"COPY {quote_name(opts.db_table)}"], []
+
+    columns = []
+    for expression, _, _ in compiler.select:
+        if not isinstance(expression, Col):
+            raise NotSupportedError(
+                f"COPY TO can only export columns, not {expression!r}."
+            )
+        columns.append(expression.target.column)
+    if columns != [field.column for field in opts.concrete_fields]:
+        sql.append(f"({', '.join(quote_name(name) for name in columns)})")
+
+    try:
+        where, where_params = compiler.compile(compiler.where)
+    except EmptyResultSet:
+        return None
+    except FullResultSet:
+        where, where_params = "", []
+    if where:
+        sql.append(f"WHERE {where}")
+        params.extend(where_params)
+
+    sql.append("TO DIRECTORY %s")
+    params.append(uri)
+    if options:
+        sql.append("WITH (%s)" % ", ".join(f"{key} = %s" for key in options))
+        params.extend(options.values())
+    return " ".join(sql), params
@@ -0,0 +1,102 @@
+"""
+Deletes of `CrateQuerySet` without Django's collector.
+
+The collector selects the rows to delete, and the rows related to them, before
+deleting them by primary key. The rows are instead deleted with their filter,
+related rows with a subquery on it, e.g.
+
+    DELETE FROM "child" WHERE "parent_id" IN (
+        SELECT U0."id" FROM "parent" U0 WHERE U0."day" < %s
+    );
+    DELETE FROM "parent" WHERE "day" < %s;
+"""
+
+import dataclasses
+from typing import Optional
+
+from django.db.models import signals
+from django.db.models.deletion import (
+    CASCADE,
+    DO_NOTHING,
+    SET_NULL,
+    get_candidate_relations_to_delete,
+)
+from django.db.models.sql.query import Query
+
+
+@dataclasses.dataclass
+class DeleteStep:
+    """Deletes the rows of `queryset`, or sets `null_field` to NULL."""
+
+    queryset: object
+    null_field: Optional[object] = None
+
+
+def delete_steps(queryset, seen=frozenset()) -> Optional[list[DeleteStep]]:
+    """
+    Returns the steps deleting the rows of `queryset` and applying the
+    `on_delete` of the relations to them, related rows first.
+
+    Returns None if the objects have to be collected: for delete signal
+    receivers, parent models, generic relations, cyclic relations or other
+    `on_delete` than CASCADE, SET_NULL and DO_NOTHING.
+
+    The filters of related rows refer to the rows of `queryset`, which are
+    deleted last. The filter of `queryset` itself must not refer to related
+    rows, see `refers_to_other_rows`.
+    """
+    model = queryset.model
+    opts = model._meta
+    if (
+        model in seen
+        or opts.concrete_model._meta.parents
+        or signals.pre_delete.has_listeners(model)
+        or signals.post_delete.has_listeners(model)
+        or any(
+            hasattr(field, "bulk_related_objects")
+            for field in opts.private_fields
+        )
+    ):
+        return None
+
+    steps = []
+    for related in get_candidate_relations_to_delete(opts):
+        field = related.field
+        on_delete = field.remote_field.on_delete
+        if on_delete is DO_NOTHING:
+            continue
+        if on_delete is not CASCADE and on_delete is not SET_NULL:
+            return None
+        related_queryset = related.related_model._base_manager.using(
+            queryset.db
+        ).filter(
+            **{f"{field.name}__in": queryset.values(field.target_field.attname)}
+        )
+        if on_delete is SET_NULL:
+            steps.append(DeleteStep(related_queryset, field))
+            continue
+        related_steps = delete_steps(related_queryset, seen | {model})
+        if related_steps is None:
+            return None
+        steps.extend(related_steps)
+    steps.append(DeleteStep(queryset))
+    return steps
+
+
+def refers_to_other_rows(query) -> bool:
+    """Whether the filter of `query` joins tables or has subqueries."""
+    if query.count_active_tables() > 1:
+        return True
+
+    def has_subquery(expression) -> bool:
+        if isinstance(expression, Query) or hasattr(expression, "query"):
+            return True
+        return any(
+            has_subquery(source)
+            for source in getattr(
+                expression, "get_source_expressions", lambda: []
+            )()
+            if source is not None
+        )
+
+    return has_subquery(query.where)
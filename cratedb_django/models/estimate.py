@@ -0,0 +1,115 @@
+"""
+Estimated row counts of `CrateModel` tables from `sys.shards`.
+
+Every primary shard reports its number of documents, summing them answers a
+count without reading the table, e.g.
+
+    SELECT sum(num_docs) FROM sys.shards
+    WHERE schema_name = CURRENT_SCHEMA AND table_name = %s AND "primary"
+
+A filter on `Meta.partition_by` columns only narrows the sum to the shards
+of the matching partitions, the filter is applied to the partition values
+of `information_schema.table_partitions`, in a subquery aliased like the
+table.
+
+`num_docs` is updated when the shards are refreshed: rows written in the
+last `refresh_interval` of the table (1 second by default) are missing, and
+deleted rows are still counted. Shards of tables not queried for 30 seconds
+are not refreshed periodically, their count can lag until the next query or
+`REFRESH TABLE`.
+"""
+
+from typing import Optional
+
+from django.core.exceptions import FullResultSet
+from django.db.models.expressions import Col, RawSQL, Ref
+from django.db.models.sql.where import ExtraWhere
+
+from .deletion import refers_to_other_rows
+from .partition import partition_columns
+
+SHARDS_SQL = (
+    "SELECT sum(num_docs) FROM sys.shards"
+    ' WHERE schema_name = CURRENT_SCHEMA AND table_name = %s AND "primary"'
+)
+
+
+def _filtered_columns(expression) -> Optional[set[str]]:
+    """
+    Returns the columns the filter `expression` refers to, None if it has
+    raw SQL or refers to annotations.
+    """
+    if isinstance(expression, (ExtraWhere, RawSQL, Ref)):
+        return None
+    if isinstance(expression, Col):
+        return {expression.target.column}
+    if getattr(expression, "contains_aggregate", False):
+        return None
+    columns = set()
+    for source in getattr(expression, "get_source_expressions", lambda: [])():
+        if source is None:
+            continue
+        source_columns = _filtered_columns(source)
+        if source_columns is None:
+            return None
+        columns |= source_columns
+    return columns
+
+
+def estimated_count_sql(queryset) -> Optional[tuple[str, list]]:
+    """
+    Returns the statement estimating the number of rows of `queryset`, or
+    None if its filter is not only on partition columns.
+
+    Raises `EmptyResultSet` if the filter matches nothing.
+    """
+    query = queryset.query
+    if (
+        query.is_sliced
+        or query.distinct
+        or query.combinator
+        or query.group_by is not None
+        or refers_to_other_rows(query)
+    ):
+        return None
+    columns = _filtered_columns(query.where)
+    if columns is None:
+        return None
+
+    opts = query.get_meta()
+    sql, params = SHARDS_SQL, [opts.db_table]
+    if not columns:
+        return sql, params
+
+    fields = {
+        opts.get_field(name).column: opts.get_field(name)
+        for name in partition_columns(queryset.model)
+    }
+    if not columns <= set(fields):
+        return None
+
+    compiler = query.get_compiler(using=queryset.db)
+    try:
+        where, where_params = compiler.compile(query.where)
+    except FullResultSet:
+        return sql, params
+
+    connection = compiler.connection
+    quote_name = connection.ops.quote_name
+    values = []
+    for column, field in fields.items():
+        value = f"\"values\"['{column}']"
+        db_type = field.cast_db_type(connection)
+        if db_type is not None:
+            value = f"CAST({value} AS {db_type})"
+        values.append(f"{value} AS {quote_name(column)}")
+    alias = compiler.quote_name_unless_alias(query.get_initial_alias())
+    sql += (
+        " AND partition_ident IN ("
+        "SELECT partition_ident FROM ("
+        f"SELECT partition_ident, {', '.join(values)}"
+        " FROM information_schema.table_partitions"
+        " WHERE table_schema = CURRENT_SCHEMA AND table_name = %s"
+        f") AS {alias} WHERE {where})"
+    )
+    return sql, [*params, opts.db_table, *where_params]
@@ -1,6 +1,20 @@
-from django.db.models.expressions import Func
+import datetime
 
-from cratedb_django.fields import TextField
+from django.db.models import Aggregate
+from django.db.models.expressions import Expression, F, Func, Value
+from django.db.models.functions import Cast
+from django.utils.duration import duration_iso_string
+
+from cratedb_django.fields import (
+    ArrayField,
+    BigIntegerField,
+    BooleanField,
+    DateTimeField,
+    DurationField,
+    FloatField,
+    ObjectField,
+    TextField,
+)
 
 
 class UUID(Func):
@@ -35,3 +49,328 @@ class Reverse(Func):
     """
     function = "reverse"
 
+
+class HyperLogLogDistinct(Aggregate):
+    """
+    Approximate number of distinct values, much faster than
+    `Count(..., distinct=True)` on big tables. `precision` ranges from 4 to
+    18, the default 14 has an error of about 1%.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/aggregation.html#hyperloglog-distinct
+    """
+
+    function = "hyperloglog_distinct"
+    name = "HyperLogLogDistinct"
+    output_field = BigIntegerField()
+    empty_result_set_value = 0
+
+    def __init__(self, expression, precision=None, **extra):
+        expressions = [expression]
+        if precision is not None:
+            expressions.append(Value(precision))
+        super().__init__(*expressions, **extra)
+
+
+class Percentile(Aggregate):
+    """
+    Percentile of the values at `fraction`, between 0 and 1. With a list of
+    fractions, the list of their percentiles.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/aggregation.html#percentile
+    """
+
+    function = "percentile"
+    name = "Percentile"
+
+    def __init__(self, expression, fraction, **extra):
+        if isinstance(fraction, (list, tuple)):
+            # The list is sent as an array parameter, as it is.
+            fraction = Value(list(fraction))
+            output_field = ArrayField(FloatField())
+        else:
+            fraction = Value(fraction)
+            output_field = FloatField()
+        extra.setdefault("output_field", output_field)
+        super().__init__(expression, fraction, **extra)
+
+
+class TopK(Aggregate):
+    """
+    The `k` most frequent values with their approximate frequency, as a
+    list of `{"item": ..., "frequency": ...}` objects.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/aggregation.html#topk
+    """
+
+    function = "topk"
+    name = "TopK"
+    output_field = ArrayField(ObjectField())
+
+    def __init__(self, expression, k=None, max_capacity=None, **extra):
+        expressions = [expression]
+        if k is not None:
+            expressions.append(Value(k))
+        if max_capacity is not None:
+            if k is None:
+                raise ValueError("max_capacity requires k.")
+            expressions.append(Value(max_capacity))
+        super().__init__(*expressions, **extra)
+
+
+class StdDev(Aggregate):
+    """
+    Population standard deviation, or the sample one with `sample=True`.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/aggregation.html#stddev
+    """
+
+    name = "StdDev"
+    output_field = FloatField()
+    # The functions of the population and of the sample.
+    functions = ("stddev_pop", "stddev_samp")
+
+    def __init__(self, expression, sample=False, **extra):
+        self.function = self.functions[bool(sample)]
+        super().__init__(expression, **extra)
+
+    def _get_repr_options(self):
+        return {
+            **super()._get_repr_options(),
+            "sample": self.function == self.functions[1],
+        }
+
+
+class Variance(StdDev):
+    """
+    Population variance, or the sample one with `sample=True`.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/aggregation.html#variance
+    """
+
+    name = "Variance"
+    functions = ("var_pop", "var_samp")
+
+
+class GeometricMean(Aggregate):
+    """
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/aggregation.html#geometric-mean
+    """
+
+    function = "geometric_mean"
+    name = "GeometricMean"
+    output_field = FloatField()
+
+
+class DateBin(Func):
+    """
+    Start of the bucket of `interval` the timestamp `expression` falls in,
+    buckets are aligned on `origin`, the Unix epoch by default. `interval`
+    is a `timedelta` or an interval string, e.g. "15 minutes".
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/scalar-functions.html#date-bin
+    """
+
+    function = "date_bin"
+    output_field = DateTimeField()
+
+    def __init__(self, interval, expression, origin=None, **extra):
+        if isinstance(interval, datetime.timedelta):
+            interval = duration_iso_string(interval)
+        if isinstance(interval, str):
+            interval = Cast(Value(interval), DurationField())
+        if origin is None:
+            origin = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+        if isinstance(origin, datetime.datetime):
+            origin = Value(origin, output_field=DateTimeField())
+        super().__init__(interval, expression, origin, **extra)
+
+
+def _vector(value):
+    """Returns an expression of `value`, a field name or a list of floats."""
+    if isinstance(value, str) or hasattr(value, "resolve_expression"):
+        return value
+    # The list is sent as an array parameter, e.g. NumPy arrays as floats.
+    return Value([float(item) for item in value])
+
+
+class KnnMatch(Func):
+    """
+    Filters the `k` nearest neighbours of `vector` in the `FloatVectorField`
+    `field`, with its HNSW index. Every shard returns its `k` nearest rows,
+    order by `VectorSimilarity` and slice to get the `k` nearest overall:
+
+    >>> Document.objects.filter(KnnMatch("embedding", query, 10)).annotate(
+    ...     similarity=VectorSimilarity("embedding", query)
+    ... ).order_by("-similarity")[:10]
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/scalar-functions.html#knn-match
+    """
+
+    function = "knn_match"
+    output_field = BooleanField()
+
+    def __init__(self, field, vector, k, **extra):
+        super().__init__(field, _vector(vector), Value(k), **extra)
+
+
+class VectorSimilarity(Func):
+    """
+    Similarity of two vectors between 0 and 1, 1 for equal vectors, from
+    their squared euclidean distance.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/builtins/scalar-functions.html#vector-similarity
+    """
+
+    function = "vector_similarity"
+    output_field = FloatField()
+
+    def __init__(self, vector, other, **extra):
+        super().__init__(_vector(vector), _vector(other), **extra)
+
+
+MATCH_TYPES = (
+    "best_fields",
+    "most_fields",
+    "cross_fields",
+    "phrase",
+    "phrase_prefix",
+)
+
+# Options of the WITH clause of MATCH.
+MATCH_OPTIONS = {
+    "analyzer",
+    "boost",
+    "cutoff_frequency",
+    "fuzziness",
+    "fuzzy_rewrite",
+    "max_expansions",
+    "minimum_should_match",
+    "operator",
+    "prefix_length",
+    "rewrite",
+    "slop",
+    "tie_breaker",
+    "zero_terms_query",
+}
+
+
+def _literal(value) -> str:
+    # The options of MATCH cannot be parameters, "%" is escaped from the
+    # placeholders, e.g. in minimum_should_match="75%".
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    if isinstance(value, str):
+        return "'{}'".format(value.replace("'", "''").replace("%", "%%"))
+    raise ValueError(f"Invalid MATCH option value {value!r}.")
+
+
+class _IndexColumn(Expression):
+    """A fulltext index of `Meta.fulltext_indexes`, MATCH reads it."""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def as_sql(self, compiler, connection):
+        return connection.ops.quote_name(self.name), []
+
+
+class Match(Expression):
+    """
+    Filters the rows whose fulltext indexed `fields` match the query string
+    `query`. `fields` is a field or index name, a list of them or a dict of
+    them and their boosts. The `match_type` ("best_fields" by default) and
+    the options of the match, e.g. `fuzziness`, are passed on, e.g.
+
+    >>> Article.objects.filter(
+    ...     Match({"title": 2, "body": None}, "quick fox", fuzziness=1)
+    ... ).order_by("-score")
+
+    Names of `Meta.fulltext_indexes` match their composite index.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/dql/fulltext.html#match-predicate
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, fields, query, *, match_type=None, **options):
+        if isinstance(fields, str):
+            fields = [fields]
+        if not isinstance(fields, dict):
+            fields = dict.fromkeys(fields)
+        if not fields:
+            raise ValueError("Match needs at least one field.")
+        if match_type is not None and match_type not in MATCH_TYPES:
+            raise ValueError(
+                f"match_type has to be one of {MATCH_TYPES!r}, "
+                f"not {match_type!r}."
+            )
+        for key in options:
+            if key not in MATCH_OPTIONS:
+                raise ValueError(f"Unexpected MATCH option {key!r}.")
+        super().__init__()
+        self.columns = [
+            F(name) if isinstance(name, str) else name for name in fields
+        ]
+        self.boosts = list(fields.values())
+        self.query = (
+            query if hasattr(query, "resolve_expression") else Value(query)
+        )
+        self.match_type = match_type
+        self.options = options
+
+    def get_source_expressions(self):
+        return [*self.columns, self.query]
+
+    def set_source_expressions(self, exprs):
+        *self.columns, self.query = exprs
+
+    def resolve_expression(self, query=None, *args, **kwargs):
+        indexes = {}
+        if query is not None and query.model is not None:
+            indexes = getattr(query.model._meta, "fulltext_indexes", None)
+        c = self.copy()
+        c.columns = [
+            _IndexColumn(column.name)
+            if isinstance(column, F) and column.name in (indexes or {})
+            else column
+            for column in c.columns
+        ]
+        return super(Match, c).resolve_expression(query, *args, **kwargs)
+
+    def as_sql(self, compiler, connection):
+        columns, params = [], []
+        for column, boost in zip(self.columns, self.boosts):
+            sql, column_params = compiler.compile(column)
+            columns.append(sql if boost is None else f"{sql} {float(boost)}")
+            params.extend(column_params)
+        if len(columns) == 1 and self.boosts[0] is None:
+            columns_sql = columns[0]
+        else:
+            columns_sql = f"({', '.join(columns)})"
+        query_sql, query_params = compiler.compile(self.query)
+        params.extend(query_params)
+
+        sql = f"MATCH({columns_sql}, {query_sql})"
+        if self.match_type is not None or self.options:
+            sql += f" USING {self.match_type or MATCH_TYPES[0]}"
+        if self.options:
+            sql += " WITH (%s)" % ", ".join(
+                f"{key} = {_literal(value)}"
+                for key, value in self.options.items()
+            )
+        return sql, params
+
+
+class Score(Expression):
+    """
+    The relevance `_score` of the rows filtered with `Match` or the `match`
+    lookup, order by it descending to rank the best matches first.
+
+    https://cratedb.com/docs/crate/reference/en/latest/general/dql/fulltext.html#usage
+    """
+
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection):
+        return "_score", []
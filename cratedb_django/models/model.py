@@ -1,6 +1,10 @@
-from django.db import models, connection
+from django.db import models, connection, router
 from django.db.models.base import ModelBase
 
+from . import copy, deletion
+from .partition import partition_key, partition_of
+from .query import CrateManager, CrateQuerySet
+
 # If a meta option has the value OMITTED, it will be omitted
 # from SQL creation. bool(Omitted) resolves to False.
 _OMITTED = type("OMITTED", (), {"__bool__": lambda _: False})
@@ -9,10 +13,17 @@ OMITTED = _OMITTED()
 # dict of all the extra options a CrateModel Meta class has.
 # (name, default_value)
 CRATE_META_OPTIONS = {
-    "auto_refresh": False,  # Automatically refresh a table on inserts.
+    # Automatically refresh a table on inserts, with "lazy" the table is
+    # refreshed before it is read next, see `DatabaseWrapper.dirty_tables`.
+    "auto_refresh": False,
+    # Make `count()` return `CrateQuerySet.estimated_count()`.
+    "estimated_count": False,
     "partition_by": OMITTED,
     "clustered_by": OMITTED,
     "number_of_shards": OMITTED,
+    # Named fulltext indexes of several fields, e.g.
+    # {"title_body_ft": {"fields": ["title", "body"], "analyzer": "english"}}
+    "fulltext_indexes": OMITTED,
 }
 
 
@@ -47,22 +58,106 @@ class CrateModel(models.Model, metaclass=MetaCrate):
 
     Methods:
         refresh: Refreshes the given model (table)
+        copy_from: Imports files into the table
     """
 
+    objects = CrateManager()
+
     def save(self, *args, **kwargs):
         super().save(
             *args, **kwargs
         )  # perform the actual save (insert or update)
         auto_refresh = getattr(self._meta, "auto_refresh", False)
-        if auto_refresh and self.pk:  # If self.pk is available, it's an insert.
-            table_name = self._meta.db_table
+        if (
+            auto_refresh is True and self.pk
+        ):  # If self.pk is available, it's an insert.
+            # Only the partition of the row is refreshed, if it is known.
+            partition = partition_of(self, connection)
+            self.refresh(None if partition is None else [partition])
+
+    def delete(self, using=None, keep_parents=False):
+        """
+        Deletes the row by primary key without collecting the related
+        objects first, see `CrateQuerySet.delete`.
+        """
+        if not self._is_pk_set() or keep_parents:
+            return super().delete(using=using, keep_parents=keep_parents)
+        using = using or router.db_for_write(self.__class__, instance=self)
+        queryset = CrateQuerySet(self.__class__, using=using).filter(pk=self.pk)
+        if deletion.delete_steps(queryset) is None:
+            return super().delete(using=using, keep_parents=keep_parents)
+
+        result = queryset.delete()
+        setattr(self, self._meta.pk.attname, None)
+        return result
+
+    delete.alters_data = True
+
+    @classmethod
+    def copy_from(
+        cls, source, *, columns=None, partition=None, **options
+    ) -> copy.CopyFromReport:
+        """
+        Imports files into the table with `COPY FROM`, e.g.
+
+        >>> report = Metrics.copy_from(
+        ...     "s3://bucket/metrics/*.json.gz",
+        ...     partition={"day": "2024-01-01"},
+        ...     compression="gzip",
+        ... )
+        >>> report.failed
+        [CopyFileReport(uri='s3://bucket/metrics/3.json.gz', ...)]
+
+        `source` is a URI, an absolute path local to the CrateDB nodes or a
+        list of them, globs are supported. Keys of JSON files and headers of CSV files
+        (format="csv") are matched to the columns, `columns` lists the
+        fields to import instead. `partition` maps partition columns of
+        `Meta.partition_by` to the value of the partition to import into.
+        Other keyword arguments are options of the WITH clause.
+        """
+        sql, params = copy.copy_from_sql(
+            cls,
+            source,
+            connection,
+            columns=columns,
+            partition=partition,
+            **options,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            report = copy.copy_from_report(cursor)
+        auto_refresh = getattr(cls._meta, "auto_refresh", False)
+        if auto_refresh == "lazy":
+            connection.dirty_tables.add(cls._meta.db_table)
+        elif auto_refresh:
+            cls.refresh()
+        return report
+
+    @classmethod
+    def refresh(cls, partitions=None):
+        """
+        Refreshes the table, or only the given partitions of it, as dicts of
+        partition field values, e.g. `refresh([{"day": date(2024, 1, 1)}])`.
+        """
+        table_name = cls._meta.db_table
+        if partitions is None:
             with connection.cursor() as cursor:
                 cursor.execute(f"refresh table {table_name}")
+            connection.dirty_tables.discard(table_name)
+            return
 
-    @classmethod
-    def refresh(cls):
+        keys = {
+            partition
+            if isinstance(partition, tuple)
+            else partition_key(cls, partition, connection)
+            for partition in partitions
+        }
+        if not keys:
+            return
+        sql, params = connection.ops.refresh_sql({table_name: keys})
         with connection.cursor() as cursor:
-            cursor.execute(f"refresh table {cls._meta.db_table}")
+            cursor.execute(sql, params)
+        connection.dirty_tables.discard(table_name, keys)
 
     class Meta:
         abstract = True
@@ -0,0 +1,74 @@
+"""
+Partitions of models with `Meta.partition_by`.
+
+A partition is identified by a tuple of `(column, value)` pairs, one for
+every partition column, with the values prepared for the database.
+"""
+
+from typing import Optional
+
+from django.db.models.expressions import BaseExpression
+
+Partition = tuple[tuple[str, object], ...]
+
+
+def partition_columns(model) -> list[str]:
+    """Returns the fields of `Meta.partition_by`."""
+    partition_by = getattr(model._meta, "partition_by", None) or []
+    if isinstance(partition_by, str):
+        partition_by = [partition_by]
+    return list(partition_by)
+
+
+def partition_key(model, values: dict, connection) -> Partition:
+    """
+    Returns the partition of the given partition field values, e.g.
+    `{"day": date(2024, 1, 1)}`.
+    """
+    columns = partition_columns(model)
+    for name in values:
+        if name not in columns:
+            raise ValueError(
+                f"{name!r} is not a partition column of "
+                f"{model._meta.db_table}, they are {columns!r}."
+            )
+    key = []
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        key.append((field.column, field.get_db_prep_save(value, connection)))
+    return tuple(key)
+
+
+def partition_of(obj, connection) -> Optional[Partition]:
+    """
+    Returns the partition `obj` is stored in, None if it is not known
+    before the row is written, e.g. with generated or NULL values.
+    """
+    model = type(obj)
+    columns = partition_columns(model)
+    if not columns:
+        return None
+
+    values = {}
+    for name in columns:
+        field = model._meta.get_field(name)
+        value = getattr(obj, field.attname)
+        if field.generated or value is None:
+            return None
+        if isinstance(value, BaseExpression):
+            # e.g. a database default.
+            return None
+        values[name] = value
+
+    key = partition_key(model, values, connection)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def partition_sql(partition: Partition, quote_name) -> tuple[str, list]:
+    """Returns the PARTITION clause of a partition and its parameters."""
+    sql = ", ".join(f"{quote_name(column)} = %s" for column, _ in partition)
+    return f"PARTITION ({sql})", [value for _, value in partition]
@@ -0,0 +1,519 @@
+import dataclasses
+from collections import Counter
+from typing import Any, Callable
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import EmptyResultSet
+from django.db import NotSupportedError, connections, models
+from django.db.models import sql
+from django.db.models.query import (
+    FlatValuesListIterable,
+    ModelIterable,
+    ValuesIterable,
+)
+
+from . import columnar, copy, deletion, estimate
+from .functions import DateBin
+
+
+@dataclasses.dataclass
+class BulkReport:
+    """
+    Per-row results of a bulk operation, in the same order as the
+    objects that were passed.
+
+    CrateDB reports a rowcount of -2 for every row that failed.
+    """
+
+    results: list[dict]
+
+    @property
+    def rowcounts(self) -> list[int]:
+        return [result.get("rowcount", -1) for result in self.results]
+
+    @property
+    def rowcount(self) -> int:
+        """Total number of affected rows."""
+        return sum(count for count in self.rowcounts if count > 0)
+
+    @property
+    def failed(self) -> list[int]:
+        """Indexes of the rows that failed."""
+        return [i for i, count in enumerate(self.rowcounts) if count == -2]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class BulkCreateResult(list):
+    """
+    The objects returned by `CrateQuerySet.bulk_create`, with the
+    `BulkReport` of the insert in `report`.
+    """
+
+    def __init__(self, objs, report: BulkReport):
+        super().__init__(objs)
+        self.report = report
+
+
+class BulkUpdateResult(int):
+    """
+    The number of rows updated by `CrateQuerySet.bulk_update`, with the
+    `BulkReport` of the update in `report`.
+    """
+
+    def __new__(cls, rowcount: int, report: BulkReport):
+        result = super().__new__(cls, rowcount)
+        result.report = report
+        return result
+
+
+class CrateQuerySet(models.QuerySet):
+    """QuerySet of `CrateModel`, with extra CrateDB specific functionality."""
+
+    def bulk_create(self, objs, *args, **kwargs) -> BulkCreateResult:
+        """
+        Inserts the objects with one parameterised statement per batch sent
+        with CrateDB's `bulk_args`.
+
+        Failed rows do not raise, check `report` of the returned list, e.g.
+
+        >>> objs = Metrics.objects.bulk_create(rows)
+        >>> objs.report.failed
+        [3, 12]
+        """
+        objs = list(objs)
+        with connections[self.db].collect_bulk_results() as collected:
+            objs = super().bulk_create(objs, *args, **kwargs)
+
+        results = {id(obj): result for obj, result in collected}
+        report = BulkReport([results.get(id(obj), {}) for obj in objs])
+        return BulkCreateResult(objs, report)
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None) -> BulkUpdateResult:
+        """
+        Updates `fields` of the objects with one parameterised
+        `UPDATE ... WHERE pk = ?` statement sent with CrateDB's `bulk_args`,
+        instead of a `CASE WHEN` per field and batch.
+
+        Failed rows do not raise, check `report` of the returned count, e.g.
+
+        >>> updated = Metrics.objects.bulk_update(rows, ["value"])
+        >>> updated.report.failed
+        [3, 12]
+
+        Objects with SQL expressions as values are updated by Django's
+        implementation, their results are not reported.
+        """
+        objs = tuple(objs)
+        if not objs or not fields:
+            # Django's implementation validates the arguments.
+            rowcount = super().bulk_update(objs, fields, batch_size)
+            return BulkUpdateResult(rowcount, BulkReport([]))
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError("Batch size must be a positive integer.")
+        if not all(obj._is_pk_set() for obj in objs):
+            raise ValueError(
+                "All bulk_update() objects must have a primary key set."
+            )
+        opts = self.model._meta
+        field_objs = [opts.get_field(name) for name in fields]
+        if any(not f.concrete or f.many_to_many for f in field_objs):
+            raise ValueError(
+                "bulk_update() can only be used with concrete fields."
+            )
+        if any(f.primary_key for f in field_objs):
+            raise ValueError(
+                "bulk_update() cannot be used with primary key fields."
+            )
+        for obj in objs:
+            obj._prepare_related_fields_for_save(
+                operation_name="bulk_update", fields=field_objs
+            )
+
+        self._for_write = True
+        compiler = sql.UpdateQuery(self.model).get_compiler(self.db)
+        bulk = compiler.execute_bulk(objs, field_objs, batch_size)
+        if bulk is None:
+            rowcount = super().bulk_update(objs, fields, batch_size)
+            return BulkUpdateResult(rowcount, BulkReport([{} for _ in objs]))
+        rowcount, results = bulk
+        return BulkUpdateResult(rowcount, BulkReport(results))
+
+    bulk_update.alters_data = True
+
+    def delete(self):
+        """
+        Deletes the rows with one DELETE statement filtered like the
+        queryset, without selecting them first.
+
+        Related rows with `on_delete=CASCADE` or `SET_NULL` are deleted or
+        updated before, filtered by a subquery. Django's collector, which
+        fetches the objects, is used when they are needed, see
+        `deletion.delete_steps`, and for filters that join tables or have
+        subqueries when related rows are deleted or updated first.
+        """
+        self._not_support_combined_queries("delete")
+        if (
+            self.query.is_sliced
+            or self.query.distinct_fields
+            or self._fields is not None
+        ):
+            # Django's implementation raises the errors.
+            return super().delete()
+
+        del_query = self._chain()
+        del_query._for_write = True
+        del_query.query.select_for_update = False
+        del_query.query.select_related = False
+        del_query.query.clear_ordering(force=True)
+
+        steps = deletion.delete_steps(del_query)
+        if steps is None or (
+            len(steps) > 1 and deletion.refers_to_other_rows(del_query.query)
+        ):
+            # The filter could match other rows once related ones are
+            # deleted, the rows are collected first.
+            return super().delete()
+
+        deleted = Counter()
+        for step in steps:
+            if step.null_field is not None:
+                step.queryset.update(**{step.null_field.name: None})
+                continue
+            deleted[step.queryset.model._meta.label] += (
+                step.queryset._raw_delete(step.queryset.db)
+            )
+        self._result_cache = None
+        return sum(deleted.values()), dict(deleted)
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def copy_to(self, uri, **options) -> copy.CopyToReport:
+        """
+        Exports the filtered rows and selected columns with `COPY TO
+        DIRECTORY`, every shard writes its own file on its node, e.g.
+
+        >>> Metrics.objects.filter(day="2024-01-01").values("ts", "value")
+        ...     .copy_to("s3://bucket/metrics/", compression="gzip")
+        CopyToReport(uri='s3://bucket/metrics/', rowcount=86400)
+
+        `uri` is a URI or an absolute path of a directory on the nodes.
+        Keyword arguments are options of the WITH clause, e.g. `format`
+        ("json_object" or "json_array") and `compression` ("gzip").
+        """
+        statement = copy.copy_to_sql(self, uri, **options)
+        if statement is None:
+            return copy.CopyToReport(uri, 0)
+        connection = connections[self.db]
+        if connection.dirty_tables:
+            from cratedb_django.compiler import read_tables
+
+            connection.refresh_dirty_tables(read_tables(self.query))
+        with connection.cursor() as cursor:
+            cursor.execute(*statement)
+            return copy.CopyToReport(uri, cursor.rowcount)
+
+    def count(self) -> int:
+        """
+        Returns `estimated_count()` on models with `Meta.estimated_count`,
+        the exact count otherwise.
+        """
+        if getattr(self.model._meta, "estimated_count", False):
+            return self.estimated_count()
+        return super().count()
+
+    def estimated_count(self) -> int:
+        """
+        Returns the number of rows from the document counts of the primary
+        shards in `sys.shards`, without reading the table. Filters on
+        `Meta.partition_by` columns only sum the matching partitions, other
+        querysets are counted exactly.
+
+        The count misses the rows written in the last refresh interval of
+        the table, see `estimate` for the details.
+        """
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        try:
+            statement = estimate.estimated_count_sql(self)
+        except EmptyResultSet:
+            return 0
+        if statement is None:
+            return super().count()
+
+        connection = connections[self.db]
+        if connection.dirty_tables:
+            connection.refresh_dirty_tables([self.model._meta.db_table])
+        with connection.cursor() as cursor:
+            cursor.execute(*statement)
+            (count,) = cursor.fetchone()
+        return count or 0
+
+    def downsample(
+        self,
+        interval,
+        field,
+        *,
+        by=(),
+        origin=None,
+        bucket="bucket",
+        **aggregates,
+    ) -> "CrateQuerySet":
+        """
+        Returns one row per bucket of `interval` of the timestamp `field`,
+        and of the `by` fields, with the given aggregates, in bucket order,
+        e.g.
+
+        >>> Metrics.objects.downsample(
+        ...     timedelta(minutes=15), "ts", by=["sensor"], value=Avg("value")
+        ... )
+        <CrateQuerySet [{'bucket': ..., 'sensor': 'a', 'value': 1.5}, ...]>
+
+        The buckets are computed with `DateBin`, aligned on `origin`.
+        """
+        return (
+            self.annotate(**{bucket: DateBin(interval, field, origin)})
+            .values(bucket, *by)
+            .annotate(**aggregates)
+            .order_by(bucket, *by)
+        )
+
+    def timeout(self, seconds) -> "CrateQuerySet":
+        """
+        Returns a queryset whose statements are killed on the cluster when
+        they run longer than `seconds`, raising `QueryTimeout`, e.g.
+
+        >>> Metrics.objects.timeout(5).aggregate(Avg("value"))
+
+        It overrides the `statement_timeout` database option. The
+        PostgreSQL wire protocol engine raises `NotSupportedError`.
+        """
+        if seconds is not None and not seconds > 0:
+            raise ValueError("The timeout has to be a positive number.")
+        if (
+            seconds is not None
+            and not connections[self.db].features.supports_statement_timeout
+        ):
+            raise NotSupportedError(
+                "Statement timeouts are not supported by this database engine."
+            )
+        clone = self._chain()
+        clone.query.statement_timeout = seconds
+        return clone
+
+    def iterator(self, chunk_size=None, *, key=None):
+        """
+        Iterates the results in chunks of `chunk_size` rows.
+
+        The HTTP endpoint returns the whole result set at once, so every chunk
+        is fetched with its own query using keyset pagination, e.g.
+        `WHERE pk > last ORDER BY pk LIMIT chunk_size`.
+
+        `key` is the field to paginate on, it defaults to the primary key. It
+        has to be unique and its values must not change while iterating,
+        prefix it with '-' to iterate in descending order.
+        """
+        if (
+            chunk_size is None
+            or connections[self.db].features.can_use_chunked_reads
+            or self.query.is_sliced
+        ):
+            return super().iterator(chunk_size)
+        queryset, lookup, name = self._keyset(chunk_size, key)
+        return self._keyset_iterator(
+            queryset, chunk_size, lookup, self._keyset_value_getter(name)
+        )
+
+    def _keyset(self, chunk_size, key):
+        """
+        Returns the queryset ordered by `key`, the lookup that filters the
+        rows after a key value and the name of the key field.
+        """
+        if chunk_size <= 0:
+            raise ValueError("Chunk size must be strictly positive.")
+
+        pk_name = self.model._meta.pk.name
+
+        def resolve_pk(ordering):
+            # "pk" and "-pk" are aliases of the primary key field.
+            if isinstance(ordering, str) and ordering.removeprefix("-") == "pk":
+                return ordering.replace("pk", pk_name, 1)
+            return ordering
+
+        key = resolve_pk(key or pk_name)
+        ordering = tuple(resolve_pk(o) for o in self.query.order_by)
+        if ordering and ordering != (key,):
+            raise ValueError(
+                f"Cannot iterate in chunks a queryset ordered by "
+                f"{self.query.order_by!r}, it is ordered by {key!r}."
+            )
+        name = key.removeprefix("-")
+        lookup = f"{name}__{'lt' if key.startswith('-') else 'gt'}"
+        return self.order_by(key), lookup, name
+
+    @staticmethod
+    def _keyset_iterator(queryset, chunk_size, lookup, value_of):
+        chunk = list(queryset[:chunk_size])
+        while chunk:
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            last = value_of(chunk[-1])
+            chunk = list(queryset.filter(**{lookup: last})[:chunk_size])
+
+    def to_arrow(self, chunk_size=None, *, key=None):
+        """
+        Returns the result as a `pyarrow.Table`, typed from the model fields.
+
+        With `chunk_size`, returns an iterator of tables of up to `chunk_size`
+        rows, fetched like `iterator(chunk_size, key=key)` does.
+        """
+        return self._export(columnar.to_arrow, chunk_size, key)
+
+    def to_numpy(self, chunk_size=None, *, key=None):
+        """
+        Returns the result as a dict of NumPy arrays, one per column.
+
+        NULLs of integer columns are NaN, `chunk_size` is like in `to_arrow`.
+        """
+        return self._export(columnar.to_numpy, chunk_size, key)
+
+    def to_pandas(self, chunk_size=None, *, key=None):
+        """
+        Returns the result as a `pandas.DataFrame`, integers and booleans
+        use nullable dtypes. `chunk_size` is like in `to_arrow`.
+        """
+        return self._export(columnar.to_pandas, chunk_size, key)
+
+    def _export(self, convert, chunk_size, key):
+        # Values are exported as CrateDB returns them, e.g. `from_db_value`
+        # of the fields is not applied.
+        if chunk_size is None:
+            return convert(columnar.fetch_columns(self))
+        if self.query.is_sliced:
+            raise ValueError("Cannot export a sliced queryset in chunks.")
+        queryset, lookup, name = self._keyset(chunk_size, key)
+        field = self.model._meta.get_field(name)
+        return self._export_chunks(
+            convert, queryset, chunk_size, lookup, field.attname
+        )
+
+    @staticmethod
+    def _export_chunks(convert, queryset, chunk_size, lookup, name):
+        converter = connections[queryset.db].converter
+        columns = columnar.fetch_columns(queryset[:chunk_size])
+        while columns.rowcount:
+            yield convert(columns)
+            if columns.rowcount < chunk_size:
+                return
+            last = columns.last_value(name, converter)
+            columns = columnar.fetch_columns(
+                queryset.filter(**{lookup: last})[:chunk_size]
+            )
+
+    def _keyset_value_getter(self, name: str) -> Callable[[Any], Any]:
+        """Returns a function that gets the key value of a result row."""
+        field = self.model._meta.get_field(name)
+        if issubclass(self._iterable_class, ModelIterable):
+            return lambda obj: getattr(obj, field.attname)
+
+        if self._fields:
+            names = list(self._fields)
+        else:
+            names = [
+                *self.query.extra_select,
+                *(f.attname for f in self.model._meta.concrete_fields),
+                *self.query.annotation_select,
+            ]
+        for candidate in (name, field.attname):
+            if candidate in names:
+                break
+        else:
+            raise ValueError(
+                f"{name!r} has to be selected to iterate in chunks by it."
+            )
+
+        if issubclass(self._iterable_class, ValuesIterable):
+            return lambda row: row[candidate]
+        if issubclass(self._iterable_class, FlatValuesListIterable):
+            return lambda row: row
+        index = names.index(candidate)
+        return lambda row: row[index]
+
+    def _native_async(self) -> bool:
+        """Whether the async methods send their statement with asyncio."""
+        # Imported here, the backend imports the models.
+        from cratedb_django import aio
+
+        return (
+            connections[self.db].features.has_native_async
+            and not self._prefetch_related_lookups
+            and aio.is_available()
+        )
+
+    async def _arun(self, func):
+        if self._native_async():
+            from cratedb_django import aio
+
+            return await aio.run(func, self.db)
+        return await sync_to_async(func)()
+
+    def __aiter__(self):
+        if not self._native_async():
+            return super().__aiter__()
+
+        from cratedb_django import aio
+
+        async def generator():
+            await aio.run(self._fetch_all, self.db)
+            for item in self._result_cache:
+                yield item
+
+        return generator()
+
+    async def aaggregate(self, *args, **kwargs):
+        return await self._arun(lambda: self.aggregate(*args, **kwargs))
+
+    async def acount(self):
+        if getattr(self.model._meta, "estimated_count", False):
+            return await self.aestimated_count()
+        return await self._arun(self.count)
+
+    async def aestimated_count(self):
+        # The statement is not sent by a compiler, aio cannot capture it.
+        return await sync_to_async(self.estimated_count)()
+
+    async def aget(self, *args, **kwargs):
+        return await self._arun(lambda: self.get(*args, **kwargs))
+
+    async def aearliest(self, *fields):
+        return await self._arun(lambda: self.earliest(*fields))
+
+    async def alatest(self, *fields):
+        return await self._arun(lambda: self.latest(*fields))
+
+    async def afirst(self):
+        return await self._arun(self.first)
+
+    async def alast(self):
+        return await self._arun(self.last)
+
+    async def ain_bulk(self, id_list=None, *, field_name="pk"):
+        return await self._arun(
+            lambda: self.in_bulk(id_list, field_name=field_name)
+        )
+
+    async def aexists(self):
+        return await self._arun(self.exists)
+
+    async def acontains(self, obj):
+        return await self._arun(lambda: self.contains(obj))
+
+
+class CrateManager(models.Manager.from_queryset(CrateQuerySet)):
+    pass
@@ -1,3 +1,8 @@
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import NotSupportedError
 from django.db.backends.base.operations import BaseDatabaseOperations
 
 
@@ -16,11 +21,154 @@ class DatabaseOperations(BaseDatabaseOperations):
         "AutoUUIDField": (None, None),
     }
 
+    # Default target size in bytes of the payload of a bulk request,
+    # can be set with the `bulk_payload_size` database option.
+    bulk_payload_size = 4 * 1024 * 1024
+
+    def bulk_batch_size(self, fields, objs):
+        """
+        Returns the number of rows that fit in a bulk request of
+        `bulk_payload_size` bytes, estimated from a sample of `objs`.
+        """
+        if not fields or not objs:
+            return len(objs)
+
+        payload_size = self.connection.settings_dict.get("OPTIONS", {}).get(
+            "bulk_payload_size", self.bulk_payload_size
+        )
+        sample = objs[:100]
+        opts = getattr(sample[0], "_meta", None)
+        attnames = [self._bulk_attname(field, opts) for field in fields]
+        # Every value is serialized as JSON, +2 approximates the separators.
+        row_size = sum(
+            len(str(getattr(obj, attname, "") if attname else "")) + 2
+            for obj in sample
+            for attname in attnames
+        ) / len(sample)
+        return max(1, min(len(objs), int(payload_size // max(row_size, 1))))
+
+    @staticmethod
+    def _bulk_attname(field, opts):
+        """
+        Returns the attribute holding the column value of `field`, a field
+        or a field name, or None if it has no column. Related objects are
+        never read, which would query them.
+        """
+        if isinstance(field, str):
+            if opts is None:
+                return None
+            try:
+                field = opts.pk if field == "pk" else opts.get_field(field)
+            except FieldDoesNotExist:
+                return None
+        if not getattr(field, "concrete", False):
+            return None
+        return field.attname
+
+    # Lookup names of `Extract` and the fields of EXTRACT they read.
+    extract_fields = {
+        "year": "YEAR",
+        "quarter": "QUARTER",
+        "month": "MONTH",
+        "week": "WEEK",
+        "day": "DAY_OF_MONTH",
+        "iso_week_day": "DAY_OF_WEEK",
+        "hour": "HOUR",
+        "minute": "MINUTE",
+        "second": "SECOND",
+    }
+
+    # Lookup names of `Trunc`, they are intervals of date_trunc.
+    trunc_kinds = (
+        "year",
+        "quarter",
+        "month",
+        "week",
+        "day",
+        "hour",
+        "minute",
+        "second",
+    )
+
+    def _convert_sql_to_tz(self, sql, params, tzname):
+        """Returns the wall time of the timestamp `sql` in `tzname`."""
+        if tzname and settings.USE_TZ:
+            return f"timezone(%s, {sql})", (tzname, *params)
+        return sql, params
+
+    def date_extract_sql(self, lookup_type, sql, params):
+        if lookup_type == "week_day":
+            # Django counts from Sunday = 1, CrateDB from Monday = 1.
+            return f"(mod(EXTRACT(DAY_OF_WEEK FROM {sql}), 7) + 1)", params
+        if lookup_type == "iso_year":
+            return f"CAST(date_format('%%x', {sql}) AS INTEGER)", params
+        try:
+            field = self.extract_fields[lookup_type]
+        except KeyError:
+            raise ValueError(f"Invalid lookup type: {lookup_type!r}") from None
+        return f"EXTRACT({field} FROM {sql})", params
+
+    def datetime_extract_sql(self, lookup_type, sql, params, tzname):
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return self.date_extract_sql(lookup_type, sql, params)
+
+    def date_trunc_sql(self, lookup_type, sql, params, tzname=None):
+        if lookup_type not in self.trunc_kinds:
+            raise ValueError(f"Invalid lookup type: {lookup_type!r}")
+        sql, params = self._convert_sql_to_tz(sql, params, tzname)
+        return f"date_trunc('{lookup_type}', {sql})", params
+
+    def datetime_trunc_sql(self, lookup_type, sql, params, tzname):
+        return self.date_trunc_sql(lookup_type, sql, params, tzname)
+
+    def datetime_cast_date_sql(self, sql, params, tzname):
+        # DATE cannot be returned, dates are midnight timestamps, see
+        # `convert_datefield_value`.
+        return self.date_trunc_sql("day", sql, params, tzname)
+
+    def datetime_cast_time_sql(self, sql, params, tzname):
+        raise NotSupportedError("CrateDB cannot cast timestamps to times.")
+
+    def time_trunc_sql(self, lookup_type, sql, params, tzname=None):
+        raise NotSupportedError("CrateDB cannot truncate times.")
+
+    def get_db_converters(self, expression):
+        converters = super().get_db_converters(expression)
+        if expression.output_field.get_internal_type() == "DateField":
+            converters.append(self.convert_datefield_value)
+        return converters
+
+    def convert_datefield_value(self, value, expression, connection):
+        # Dates are stored and returned as timestamps.
+        if isinstance(value, datetime.datetime):
+            value = value.date()
+        return value
+
     def quote_name(self, name) -> str:
         if name.startswith('"') and name.endswith('"'):
             return name  # Quoting once is enough.
         return f'"{name}"'
 
+    def refresh_sql(self, tables: dict) -> tuple[str, list]:
+        """
+        Returns one REFRESH TABLE statement for `tables`, a mapping of table
+        names to the partitions to refresh, or None to refresh all of them.
+        """
+        from cratedb_django.models.partition import partition_sql
+
+        targets, params = [], []
+        for table, partitions in sorted(tables.items()):
+            if partitions is None:
+                targets.append(self.quote_name(table))
+                continue
+            for partition in sorted(partitions, key=repr):
+                sql, partition_params = partition_sql(
+                    partition, self.quote_name
+                )
+                targets.append(f"{self.quote_name(table)} {sql}")
+                params.extend(partition_params)
+        return f"REFRESH TABLE {', '.join(targets)}", params
+
     def sql_flush(
         self, style, tables, *, reset_sequences=False, allow_cascade=False
     ) -> list[str]:
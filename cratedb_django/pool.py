@@ -0,0 +1,84 @@
+"""
+Process-wide crate client connections, shared between threads.
+
+With the `shared_connection` database option, every `DatabaseWrapper` (one
+per thread) with the same connection parameters uses the same
+`crate.client.connection.Connection`, and with it the same HTTP connection
+pools. Set `pool_size` to the number of threads that query concurrently.
+"""
+
+import dataclasses
+import threading
+
+from crate.client.connection import Connection
+
+from .balancer import connect
+
+_lock = threading.Lock()
+_connections: dict[tuple, Connection] = {}
+
+
+def _key(conn_params: dict) -> tuple:
+    return tuple(
+        sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in conn_params.items()
+        )
+    )
+
+
+def get_shared_connection(conn_params: dict) -> Connection:
+    """Returns the shared connection of the given parameters."""
+    key = _key(conn_params)
+    with _lock:
+        connection = _connections.get(key)
+        if connection is None or connection._closed:
+            connection = _connections[key] = connect(conn_params)
+        return connection
+
+
+def is_shared(connection) -> bool:
+    with _lock:
+        return any(shared is connection for shared in _connections.values())
+
+
+def close_shared_connections() -> None:
+    with _lock:
+        for connection in _connections.values():
+            connection.close()
+        _connections.clear()
+
+
+@dataclasses.dataclass
+class PoolStats:
+    """HTTP connection pool statistics of one server."""
+
+    maxsize: int
+    # Connections checked out of the pool, i.e. with a request in flight.
+    in_use: int
+    # Connections opened so far, growing while `in_use` is at `maxsize`
+    # means requests open throwaway connections: the pool is saturated.
+    num_connections: int
+    num_requests: int
+
+    @property
+    def saturation(self) -> float:
+        return self.in_use / self.maxsize if self.maxsize else 0.0
+
+
+def pool_stats(connection: Connection) -> dict[str, PoolStats]:
+    """Returns the HTTP connection pool statistics of every server."""
+    stats = {}
+    for server, http_server in connection.client.server_pool.items():
+        http_pool = http_server.pool
+        # The queue holds the idle connections, or None placeholders for
+        # connections not opened yet.
+        maxsize = http_pool.pool.maxsize if http_pool.pool else 0
+        idle = http_pool.pool.qsize() if http_pool.pool else 0
+        stats[server] = PoolStats(
+            maxsize=maxsize,
+            in_use=maxsize - idle,
+            num_connections=http_pool.num_connections,
+            num_requests=http_pool.num_requests,
+        )
+    return stats
@@ -0,0 +1,172 @@
+"""
+CrateDB backend that uses the PostgreSQL wire protocol through psycopg,
+instead of JSON over HTTP, e.g.
+
+>>> DATABASES = {
+...     "default": {
+...         "ENGINE": "cratedb_django.postgres",
+...         "HOST": "localhost",
+...         "PORT": 5432,
+...         "USER": "crate",
+...     }
+... }
+
+`QuerySet.iterator()` streams the results with server-side cursors
+(`DECLARE ... CURSOR` / `FETCH`) and inserts send their parameters in binary.
+"""
+
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import NotSupportedError
+
+from cratedb_django.base import (
+    BACKEND_OPTIONS,
+    FORMAT_QMARK_REGEX,
+    CrateDBCursorMixin,
+    _is_bool,
+    check_options,
+)
+from cratedb_django.base import DatabaseWrapper as CrateDBDatabaseWrapper
+from cratedb_django.features import DatabaseFeatures as CrateDBFeatures
+
+try:
+    import psycopg
+except ImportError as e:
+    raise ImproperlyConfigured(
+        f"Error loading psycopg module: {e}, install it with "
+        "`pip install cratedb-django[postgres]`"
+    ) from e
+
+# OPTIONS of this backend that are not passed to psycopg.
+PG_BACKEND_OPTIONS = BACKEND_OPTIONS | {
+    "binary_parameters": (_is_bool, "a boolean")
+}
+
+
+class PGCursorMixin(CrateDBCursorMixin):
+    # Whether INSERT parameters are sent in binary format, can be set with
+    # the `binary_parameters` database option.
+    binary_parameters = True
+
+    @property
+    def duration(self):
+        # The server side duration is only reported by the HTTP endpoint.
+        return -1
+
+    def convert_query(self, query, *, param_names=None) -> str:
+        # psycopg understands the "format" and "pyformat" styles, only
+        # the placeholders of inserts are changed to request binary format.
+        if (
+            self.binary_parameters
+            and param_names is None
+            and query[:6].upper() == "INSERT"
+        ):
+            return FORMAT_QMARK_REGEX.sub("%b", query)
+        return query
+
+    def _set_bulk_result(self, rowcount, duration, results) -> None:
+        self._rowcount = rowcount
+
+
+class PGCursor(PGCursorMixin, psycopg.Cursor):
+    pass
+
+
+class PGServerCursor(PGCursorMixin, psycopg.ServerCursor):
+    pass
+
+
+class DatabaseFeatures(CrateDBFeatures):
+    # Server-side cursors fetch the results in chunks.
+    can_use_chunked_reads = True
+    has_native_async = False
+    # The statements are not tagged and killed like over HTTP.
+    supports_statement_timeout = False
+
+
+class DatabaseWrapper(CrateDBDatabaseWrapper):
+    Database = psycopg
+    features_class = DatabaseFeatures
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._named_cursor_idx = 0
+
+    def get_connection_params(self):
+        options = dict(self.settings_dict.get("OPTIONS") or {})
+        if "statement_timeout" in options:
+            raise ImproperlyConfigured(
+                "statement_timeout is not supported by the PostgreSQL wire "
+                "protocol engine."
+            )
+        check_options(options, PG_BACKEND_OPTIONS)
+
+        conn_params = {
+            "host": self.settings_dict.get("HOST") or "localhost",
+            "port": self.settings_dict.get("PORT") or 5432,
+            "user": self.settings_dict.get("USER") or "crate",
+            # The database name is used as the default schema by CrateDB.
+            "dbname": self.settings_dict.get("NAME") or "doc",
+        }
+        if self.settings_dict.get("PASSWORD"):
+            conn_params["password"] = self.settings_dict["PASSWORD"]
+
+        # Any other option is passed to `psycopg.connect`.
+        conn_params.update(
+            {
+                key: value
+                for key, value in options.items()
+                if key not in PG_BACKEND_OPTIONS
+            }
+        )
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        # CrateDB has no transactions, statements are always autocommitted.
+        connection = psycopg.connect(
+            **conn_params, autocommit=True, cursor_factory=PGCursor
+        )
+        connection.server_cursor_factory = PGServerCursor
+        return connection
+
+    def _set_autocommit(self, autocommit):
+        with self.wrap_database_errors:
+            self.connection.autocommit = True
+
+    def create_cursor(self, name=None):
+        if name:
+            # In autocommit mode, the cursor is used outside of a
+            # transaction, hence use a holdable cursor.
+            cursor = self.connection.cursor(
+                name, scrollable=False, withhold=True
+            )
+        else:
+            cursor = self.connection.cursor()
+
+        options = self.settings_dict.get("OPTIONS") or {}
+        if "bulk_chunk_size" in options:
+            cursor.bulk_chunk_size = options["bulk_chunk_size"]
+        if "binary_parameters" in options:
+            cursor.binary_parameters = options["binary_parameters"]
+        return cursor
+
+    def raw_cursor(self):
+        raise NotSupportedError(
+            "Raw CrateDB results are only available over HTTP."
+        )
+
+    def chunked_cursor(self):
+        self._named_cursor_idx += 1
+        # The thread ident avoids reusing names in other threads.
+        return self._cursor(
+            name=f"_django_curs_{threading.get_ident()}_"
+            f"{self._named_cursor_idx}"
+        )
+
+    def is_usable(self):
+        try:
+            self.connection.execute("SELECT 1")
+        except psycopg.Error:
+            return False
+        return True
@@ -4,6 +4,7 @@ from typing import Sequence
 
 from django.db.backends.base.schema import BaseDatabaseSchemaEditor
 
+from cratedb_django.fields.base import fulltext_options_sql
 from cratedb_django.models.model import OMITTED
 
 
@@ -93,6 +94,14 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
     def table_sql(self, model) -> tuple:
         sql = list(super().table_sql(model))
 
+        fulltext_indexes = getattr(model._meta, "fulltext_indexes", OMITTED)
+        if fulltext_indexes is not OMITTED:
+            # The indexes are table elements, after the columns.
+            sql[0] = (
+                f"{sql[0][:-1]}, "
+                f"{self.fulltext_indexes_sql(model, fulltext_indexes)})"
+            )
+
         partition_by = getattr(model._meta, "partition_by", OMITTED)
         if partition_by is not OMITTED:
             if not isinstance(partition_by, Sequence) or not partition_by:
@@ -138,3 +147,30 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
             sql[0] += f" CLUSTERED INTO ({number_of_shards})"
 
         return tuple(sql)
+
+    def fulltext_indexes_sql(self, model, fulltext_indexes) -> str:
+        """Returns the INDEX table elements of `Meta.fulltext_indexes`."""
+        if not isinstance(fulltext_indexes, dict) or not fulltext_indexes:
+            raise ValueError(
+                "fulltext_indexes has to be a non-empty dict, e.g. "
+                "{'title_body_ft': {'fields': ['title', 'body']}}"
+            )
+        indexes = []
+        for name, index in fulltext_indexes.items():
+            fields = index.get("fields") if isinstance(index, dict) else None
+            if not fields or isinstance(fields, str):
+                raise ValueError(
+                    f"fulltext index {name!r} has to have a list of fields."
+                )
+            for field in fields:
+                check_field(model, field)
+            columns = ", ".join(
+                self.quote_name(model._meta.get_field(field).column)
+                for field in fields
+            )
+            options = fulltext_options_sql(index.get("analyzer", True))
+            indexes.append(
+                f"INDEX {self.quote_name(name)} USING FULLTEXT ({columns})"
+                f"{options}"
+            )
+        return ", ".join(indexes)
@@ -0,0 +1,83 @@
+"""
+Statement timeouts.
+
+CrateDB keeps running a statement when the HTTP client gives up on it. A
+statement with a timeout is tagged with a unique comment, and when the
+timeout expires its job is looked up in `sys.jobs` and killed, e.g.
+
+    /* cratedb_django:2f1c... */ SELECT ... FROM "metrics" ...
+    SELECT id FROM sys.jobs WHERE stmt LIKE '/* cratedb_django:2f1c... */%'
+    KILL '8d4e...'
+
+The statement then fails and `QueryTimeout` is raised.
+"""
+
+import logging
+import threading
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from .exceptions import QueryTimeout
+
+logger = logging.getLogger("cratedb_django")
+
+# Timeout in seconds of the statements executed in the context, it is set
+# by the compilers for `CrateQuerySet.timeout`.
+statement_timeout: ContextVar[Optional[float]] = ContextVar(
+    "statement_timeout", default=None
+)
+
+JOBS_SQL = "SELECT id FROM sys.jobs WHERE stmt LIKE ?"
+
+
+def current(default: Optional[float] = None) -> Optional[float]:
+    """Returns the timeout of the context, or `default` if none is set."""
+    timeout = statement_timeout.get()
+    return default if timeout is None else timeout
+
+
+def new_tag() -> str:
+    return f"/* cratedb_django:{uuid.uuid4().hex} */"
+
+
+def kill_sql(job_id: str) -> str:
+    # KILL takes no parameters, the id is validated to be a UUID.
+    return f"KILL '{uuid.UUID(job_id)}'"
+
+
+def timeout_error(timeout: float, sql: str) -> QueryTimeout:
+    return QueryTimeout(
+        f"Statement killed after its timeout of {timeout}s: {sql}"
+    )
+
+
+class Watchdog:
+    """
+    Kills the statement tagged with `tag` with the crate `client`, if it is
+    still running after `timeout` seconds.
+    """
+
+    def __init__(self, client, timeout: float):
+        self.client = client
+        self.timeout = timeout
+        self.tag = new_tag()
+        self.fired = False
+        self._timer = threading.Timer(timeout, self.kill)
+        self._timer.daemon = True
+
+    def __enter__(self) -> "Watchdog":
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._timer.cancel()
+
+    def kill(self) -> None:
+        self.fired = True
+        try:
+            jobs = self.client.sql(JOBS_SQL, [f"{self.tag}%"])
+            for (job_id,) in jobs["rows"]:
+                self.client.sql(kill_sql(job_id))
+        except Exception:
+            logger.exception("Failed to kill the statement %s", self.tag)
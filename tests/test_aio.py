@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from django.db import NotSupportedError, connection
+
+pytest.importorskip("aiohttp")
+
+from cratedb_django import aio  # noqa: E402
+from cratedb_django.base import query_cache  # noqa: E402
+from tests.test_app.models import LazyRefreshModel, SimpleModel  # noqa: E402
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await aio.close_connections()
+
+    return asyncio.run(main())
+
+
+def test_async_cursor():
+    """Verify that the async cursor converts queries like the sync one."""
+
+    async def query():
+        cursor = aio.get_connection().cursor()
+        await cursor.execute("select %s, '%%s'", [1])
+        return cursor.fetchall()
+
+    query_cache.clear()
+    assert run(query()) == [[1, "%s"]]
+    assert query_cache.info().currsize == 1
+
+
+def test_async_executemany():
+    """Verify that generators are sent in chunks, returning the rowcount."""
+
+    async def insert():
+        cursor = aio.get_connection().cursor()
+        cursor.bulk_chunk_size = 2
+        return await cursor.executemany(
+            'INSERT INTO "test_app_simplemodel" ("id", "field") VALUES (%s, %s)',
+            ((f"id{i}", str(i)) for i in range(5)),
+        )
+
+    assert run(insert()) == 5
+    SimpleModel.refresh()
+    assert SimpleModel.objects.count() == 5
+
+
+def test_sessions_closed_with_loop():
+    """Verify that the sessions are closed at the end of `asyncio.run`."""
+
+    async def session():
+        return aio.get_connection()._get_session()
+
+    assert asyncio.run(session()).closed
+
+
+def test_failover():
+    """Verify that servers that cannot be connected to are skipped."""
+
+    async def query():
+        params = connection.get_connection_params()
+        conn = aio.AsyncConnection(
+            ["localhost:1", *params.pop("servers")], **params
+        )
+        try:
+            return (await conn.sql("select 1"))["rows"]
+        finally:
+            await conn.close()
+
+    assert run(query()) == [[1]]
+
+
+def test_queryset_async_methods():
+    """Verify that async queryset methods run natively with asyncio."""
+    SimpleModel.objects.bulk_create(
+        [SimpleModel(id="a", field="a"), SimpleModel(id="b", field="b")]
+    )
+    SimpleModel.refresh()
+
+    async def queries():
+        assert SimpleModel.objects.all()._native_async()
+        assert await SimpleModel.objects.acount() == 2
+        assert await SimpleModel.objects.filter(field="a").aexists()
+        assert (await SimpleModel.objects.aget(id="b")).field == "b"
+        return [obj.id async for obj in SimpleModel.objects.order_by("id")]
+
+    assert run(queries()) == ["a", "b"]
+
+
+def test_lazy_refresh():
+    """Verify that async reads refresh the dirty tables they read."""
+    table = "test_app_lazyrefreshmodel"
+    for i in range(3):
+        LazyRefreshModel.objects.create(field=str(i))
+
+    async def count():
+        # The connection of the event loop's context.
+        connection.dirty_tables.add(table)
+        count = await LazyRefreshModel.objects.acount()
+        assert not connection.dirty_tables
+        return count
+
+    assert run(count()) == 3
+
+
+def test_run_single_statement():
+    """Verify that `aio.run` refuses operations with several statements."""
+
+    def two_statements():
+        SimpleModel.objects.count()
+        SimpleModel.objects.exists()
+
+    with pytest.raises(NotSupportedError):
+        run(aio.run(two_statements))
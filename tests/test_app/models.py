@@ -1,6 +1,7 @@
 import datetime
 import uuid
 
+from django.db import models
 from django.db.models import F
 
 from cratedb_django import fields
@@ -82,6 +83,79 @@ class RefreshModel(CrateModel):
         auto_refresh = True
 
 
+class LazyRefreshModel(CrateModel):
+    field = fields.TextField()
+
+    class Meta:
+        app_label = "test_app"
+        auto_refresh = "lazy"
+
+
+class PartitionedLazyRefreshModel(CrateModel):
+    field = fields.TextField()
+    day = fields.IntegerField()
+
+    class Meta:
+        app_label = "test_app"
+        auto_refresh = "lazy"
+        partition_by = ["day"]
+
+
+class EstimatedCountModel(CrateModel):
+    field = fields.TextField()
+    day = fields.IntegerField()
+
+    class Meta:
+        app_label = "test_app"
+        partition_by = ["day"]
+        estimated_count = True
+
+
+class TimeSeriesModel(CrateModel):
+    ts = fields.DateTimeField()
+    sensor = fields.TextField()
+    value = fields.FloatField()
+
+    class Meta:
+        app_label = "test_app"
+
+
+class VectorModel(CrateModel):
+    name = fields.TextField()
+    embedding = fields.FloatVectorField(dimensions=3)
+
+    class Meta:
+        app_label = "test_app"
+
+
+class FulltextModel(CrateModel):
+    title = fields.TextField(fulltext="english")
+    body = fields.TextField(fulltext=True)
+
+    class Meta:
+        app_label = "test_app"
+        fulltext_indexes = {
+            "title_body_ft": {
+                "fields": ["title", "body"],
+                "analyzer": "english",
+            }
+        }
+
+
+class EventModel(CrateModel):
+    payload = fields.ObjectField()
+    stats = fields.ObjectField(
+        policy="strict",
+        schema={
+            "count": fields.IntegerField(),
+            "device": {"id": fields.TextField()},
+        },
+    )
+
+    class Meta:
+        app_label = "test_app"
+
+
 class GeneratedModel(CrateModel):
     f1 = fields.IntegerField()
     f2 = fields.IntegerField()
@@ -99,3 +173,27 @@ class GeneratedModel(CrateModel):
 
     class Meta:
         app_label = "test_app"
+
+
+class DeleteParent(CrateModel):
+    id = fields.TextField(primary_key=True)
+    day = fields.IntegerField()
+
+    class Meta:
+        app_label = "test_app"
+
+
+class DeleteChild(CrateModel):
+    id = fields.TextField(primary_key=True)
+    parent = models.ForeignKey(DeleteParent, on_delete=models.CASCADE)
+
+    class Meta:
+        app_label = "test_app"
+
+
+class DeleteNote(CrateModel):
+    id = fields.TextField(primary_key=True)
+    child = models.ForeignKey(DeleteChild, on_delete=models.SET_NULL, null=True)
+
+    class Meta:
+        app_label = "test_app"
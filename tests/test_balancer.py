@@ -0,0 +1,76 @@
+from django.db import connection
+
+from cratedb_django.balancer import LatencyAwareClient
+from cratedb_django.base import DatabaseWrapper
+
+UNREACHABLE = "http://127.0.0.1:1"
+
+
+def test_latency_aware_selection():
+    """Verify that the server with the lowest score gets the request."""
+    client = LatencyAwareClient(["http://a:4200", "http://b:4200"])
+    stats = client._stats
+    stats["http://a:4200"].latency = 0.010
+    stats["http://b:4200"].latency = 0.002
+    assert client._get_server() == "http://b:4200"
+
+    # Requests in flight and errors make a server look slower.
+    stats["http://b:4200"].in_flight = 9
+    assert client._get_server() == "http://a:4200"
+    stats["http://b:4200"].in_flight = 0
+    stats["http://b:4200"].error_rate = 0.5
+    assert client._get_server() == "http://a:4200"
+
+
+def test_eviction_and_restore():
+    """Verify that failing servers are evicted with a growing backoff and
+    restored as the slowest healthy server."""
+    client = LatencyAwareClient(
+        ["http://a:4200", "http://b:4200"],
+        eviction_backoff=1,
+        probe_interval=0,
+    )
+    client._stats["http://a:4200"].latency = 0.005
+    client._drop_server("http://b:4200", "unavailable")
+    client._drop_server("http://b:4200", "unavailable")
+
+    stats = client.server_stats()["http://b:4200"]
+    assert not stats.healthy
+    assert stats.failures == 2
+    assert stats.evictions == 1
+    assert client._get_server() == "http://a:4200"
+
+    client._stats["http://b:4200"].evicted_until = 0
+    client._get_server()
+    stats = client.server_stats()["http://b:4200"]
+    assert stats.healthy
+    assert stats.latency == 0.005
+
+
+def test_server_selection_option():
+    """Verify that queries avoid an unreachable server with
+    `server_selection = "latency"`."""
+    settings_dict = dict(connection.settings_dict)
+    settings_dict["SERVERS"] = [
+        *connection.settings_dict["SERVERS"],
+        UNREACHABLE,
+    ]
+    settings_dict["OPTIONS"] = {
+        "server_selection": "latency",
+        "eviction_backoff": 60,
+        "probe_interval": 0,
+    }
+    wrapper = DatabaseWrapper(settings_dict)
+    try:
+        for _ in range(5):
+            with wrapper.cursor() as cursor:
+                cursor.execute("select 1")
+                assert cursor.fetchall() == [[1]]
+
+        stats = wrapper.server_stats()
+        assert not stats[UNREACHABLE].healthy
+        (healthy,) = [s for s in stats.values() if s.healthy]
+        assert healthy.latency > 0
+        assert healthy.errors == 0
+    finally:
+        wrapper.close()
@@ -1,7 +1,21 @@
+import datetime
+import threading
+import time
+
+from cratedb_django import pool
+from cratedb_django.base import CrateDBCursorWrapper
 from cratedb_django.base import DatabaseWrapper
+from cratedb_django.base import QueryCache, query_cache
+from cratedb_django.exceptions import QueryTimeout
 
 import pytest
+from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.test_app.models import DeleteChild, SimpleModel
 
 
 def test_get_connection_params():
@@ -69,7 +83,273 @@ def test_get_connection_params():
     c = DatabaseWrapper(opts).get_connection_params()
     assert c["verify_ssl_cert"] is False
 
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"query_cache_size": 10}
+    c = DatabaseWrapper(opts).get_connection_params()
+    assert "query_cache_size" not in c
+
+    for value in (True, False):
+        opts = dict(base_opts)
+        opts["OPTIONS"] = {"query_cache_size": value}
+        with pytest.raises(
+            ImproperlyConfigured, match=r"query_cache_size has to be"
+        ):
+            DatabaseWrapper(opts).get_connection_params()
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"pool_size": True}
+    with pytest.raises(ImproperlyConfigured, match=r"pool_size has to be"):
+        DatabaseWrapper(opts).get_connection_params()
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"bulk_chunk_size": 0}
+    with pytest.raises(
+        ImproperlyConfigured, match=r"bulk_chunk_size has to be a positive"
+    ):
+        DatabaseWrapper(opts).get_connection_params()
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"statement_timeout": 0}
+    with pytest.raises(
+        ImproperlyConfigured, match=r"statement_timeout has to be a positive"
+    ):
+        DatabaseWrapper(opts).get_connection_params()
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {
+        "pool_size": 10,
+        "timeout": 2.5,
+        "backoff_factor": 0,
+        "socket_keepalive": True,
+        "socket_tcp_keepidle": 60,
+        "shared_connection": True,
+    }
+    c = DatabaseWrapper(opts).get_connection_params()
+    assert c["pool_size"] == 10
+    assert c["timeout"] == 2.5
+    assert "shared_connection" not in c
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"server_selection": "latency", "probe_interval": 0}
+    c = DatabaseWrapper(opts).get_connection_params()
+    assert c["server_selection"] == "latency"
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"server_selection": "fastest"}
+    with pytest.raises(
+        ImproperlyConfigured, match=r"server_selection has to be one of"
+    ):
+        DatabaseWrapper(opts).get_connection_params()
+
+    opts = dict(base_opts)
+    opts["OPTIONS"] = {"pool_size": "10"}
+    with pytest.raises(
+        ImproperlyConfigured, match=r"pool_size has to be a positive integer"
+    ):
+        DatabaseWrapper(opts).get_connection_params()
+
     opts = dict(base_opts)
     opts["USER"] = ""
     c = DatabaseWrapper(opts).get_connection_params()
     assert c["username"] is None
+
+
+def test_query_cache():
+    """Verify that converted queries are cached and the counters reported."""
+    query_cache.clear()
+    connection.ensure_connection()
+    cursor = connection.create_cursor()
+    assert isinstance(cursor, CrateDBCursorWrapper)
+
+    query = "SELECT %s, '%%s' FROM t WHERE a = %s"
+    expected = "SELECT ?, '%s' FROM t WHERE a = ?"
+    assert cursor.convert_query(query) == expected
+    assert cursor.convert_query(query) == expected
+    assert query_cache.info().hits == 1
+    assert query_cache.info().misses == 1
+
+    # Same query text with param names is a different entry.
+    query = "SELECT %(a)s"
+    assert cursor.convert_query(query, param_names=["a"]) == "SELECT :a"
+    assert query_cache.info().misses == 2
+
+    query_cache.resize(1)
+    assert query_cache.info().currsize == 1
+    assert query_cache.get((query, ("a",))) == "SELECT :a"
+
+    with pytest.raises(ImproperlyConfigured, match="query_cache_size"):
+        query_cache.resize(-1)
+    with pytest.raises(ImproperlyConfigured, match="query_cache_size"):
+        query_cache.resize(True)
+
+    query_cache.resize(0)
+    cursor.convert_query("SELECT 1")
+    assert query_cache.info().currsize == 0
+    query_cache.resize(1024)
+
+
+def test_query_cache_size(monkeypatch):
+    """Verify that the size of the query cache is read once, as the largest
+    `query_cache_size` option of the databases."""
+    monkeypatch.setattr(
+        settings,
+        "DATABASES",
+        {
+            "default": {"OPTIONS": {"query_cache_size": 10}},
+            "other": {"OPTIONS": {"query_cache_size": 20}},
+            "postgres": {},
+        },
+    )
+    cache = QueryCache()
+    assert cache.info().maxsize == 20
+    monkeypatch.setattr(settings, "DATABASES", {"default": {}})
+    assert cache.info().maxsize == 20
+    assert QueryCache().info().maxsize == QueryCache.default_maxsize
+    assert QueryCache(5).info().maxsize == 5
+
+
+def test_executemany_streams_chunks():
+    """Verify that executemany sends generators in chunks and aggregates
+    the row counts."""
+    with CaptureQueriesContext(connection) as ctx:
+        with connection.cursor() as cursor:
+            cursor.cursor.bulk_chunk_size = 2
+            rowcount = cursor.executemany(
+                'INSERT INTO "test_app_simplemodel" ("field") VALUES (%s)',
+                ([str(i)] for i in range(5)),
+            )
+            assert rowcount == 5
+            assert cursor.rowcount == 5
+
+            # Sequences return the result of every row.
+            results = cursor.executemany(
+                'INSERT INTO "test_app_simplemodel" ("field") VALUES (%s)',
+                [[str(i)] for i in range(3)],
+            )
+            assert results == [{"rowcount": 1}] * 3
+    assert len(ctx.captured_queries) == 2
+
+    SimpleModel.refresh()
+    assert SimpleModel.objects.count() == 8
+
+
+def test_shared_connection():
+    """Verify that wrappers of different threads share the same connection
+    when `shared_connection` is set."""
+    settings_dict = dict(connection.settings_dict)
+    settings_dict["OPTIONS"] = {"shared_connection": True, "pool_size": 4}
+
+    connections = []
+
+    def connect():
+        wrapper = DatabaseWrapper(settings_dict)
+        wrapper.ensure_connection()
+        connections.append(wrapper.connection)
+        with wrapper.cursor() as cursor:
+            cursor.execute("select 1")
+        wrapper.close()
+
+    threads = [threading.Thread(target=connect) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert connections[0] is connections[1]
+    # Closing a wrapper does not close the shared connection.
+    assert not connections[0]._closed
+
+    wrapper = DatabaseWrapper(settings_dict)
+    (stats,) = wrapper.pool_stats().values()
+    assert stats.maxsize == 4
+    assert stats.num_requests >= 2
+    assert 0 <= stats.saturation <= 1
+
+    pool.close_shared_connections()
+    assert connections[0]._closed
+
+
+def test_bulk_batch_size():
+    """Verify that batches are sized from the column values, without
+    fetching related objects."""
+    objs = [DeleteChild(id=f"c{i}", parent_id="p" * 100) for i in range(10)]
+    with CaptureQueriesContext(connection) as ctx:
+        for fields in (["parent"], [DeleteChild._meta.get_field("parent")]):
+            assert connection.ops.bulk_batch_size(fields, objs) == 10
+        assert connection.ops.bulk_batch_size(["pk", "parent"], objs) == 10
+    assert not ctx.captured_queries
+
+    connection.settings_dict["OPTIONS"]["bulk_payload_size"] = 1000
+    try:
+        # 100 characters and 2 separators per row.
+        assert connection.ops.bulk_batch_size(["parent"], objs) == 9
+    finally:
+        del connection.settings_dict["OPTIONS"]["bulk_payload_size"]
+
+
+def test_close_refresh_error(caplog):
+    """Verify that a failed refresh of the dirty tables is logged and the
+    connection is still closed."""
+    wrapper = DatabaseWrapper(dict(connection.settings_dict))
+    wrapper.ensure_connection()
+    wrapper.dirty_tables.add("nonexistent_table")
+
+    wrapper.close()
+    assert wrapper.connection is None
+    assert not wrapper.dirty_tables
+    assert "Failed to refresh the tables nonexistent_table" in caplog.text
+
+
+def test_request_finished_refresh_error(caplog):
+    """Verify that a failed refresh at request end is logged instead of
+    raised out of `request_finished`."""
+    connection.dirty_tables.add("nonexistent_table")
+    request_finished.send(sender=None)
+    assert not connection.dirty_tables
+    assert "Failed to refresh the tables nonexistent_table" in caplog.text
+
+
+def test_statement_timeout():
+    """Verify that statements running longer than their timeout are killed
+    on the cluster and raise `QueryTimeout`."""
+    settings_dict = dict(connection.settings_dict)
+    settings_dict["OPTIONS"] = {"statement_timeout": 0.5}
+    wrapper = DatabaseWrapper(settings_dict)
+    try:
+        with wrapper.cursor() as cursor:
+            start = time.monotonic()
+            with pytest.raises(QueryTimeout, match="timeout of 0.5s"):
+                cursor.execute("select sleep(10000)")
+            assert time.monotonic() - start < 5
+
+            cursor.execute("select count(*) from sys.jobs")
+            assert cursor.fetchall()
+    finally:
+        wrapper.close()
+
+    assert SimpleModel.objects.timeout(10).count() >= 0
+    with pytest.raises(ValueError, match="positive number"):
+        SimpleModel.objects.timeout(0)
+
+
+def test_column_converter():
+    """Verify that rows are converted by a function built per col_types."""
+    converter = connection.converter
+    assert connection.create_cursor()._converter is converter
+
+    # text, timestamp, array of timestamps, integer
+    col_types = [4, 11, [100, 11], 9]
+    convert = converter.row_converter(col_types)
+    assert converter.row_converter(list(col_types)) is convert
+    assert convert(["a", 0, [0, None], 1]) == [
+        "a",
+        datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc),
+        [datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc), None],
+        1,
+    ]
+
+    # Nothing to convert.
+    assert converter.row_converter([4, [100, 9], 12]) is None
+    # Types unknown to the client, e.g. float_vector, are returned as is.
+    assert converter.row_converter([4, 28, [100, 28]]) is None
+    assert converter.get(28)([1.0, 0.5]) == [1.0, 0.5]
@@ -83,6 +83,26 @@ def test_field_array_deconstruct():
     assert isinstance(kwargs["base_field"], fields.CharField)
 
 
+def test_field_float_vector():
+    """Verify the DDL and the deconstruction of FloatVectorField."""
+
+    class SomeModel(CrateModel):
+        f = fields.FloatVectorField(dimensions=384)
+
+        class Meta:
+            app_label = "_crate_test"
+
+    with connection.schema_editor() as schema_editor:
+        sql, params = schema_editor.column_sql(
+            SomeModel, SomeModel._meta.get_field("f")
+        )
+        assert sql == "FLOAT_VECTOR(384) NOT NULL"
+
+    name, path, args, kwargs = SomeModel._meta.get_field("f").deconstruct()
+    assert path == "cratedb_django.fields.vector.FloatVectorField"
+    assert kwargs["dimensions"] == 384
+
+
 def test_field_array_insert():
     """
     Verify that we can insert all array fields from python objects.
@@ -0,0 +1,69 @@
+import logging
+
+from django.db import connection
+
+from cratedb_django import instrumentation
+
+
+def test_hooks_receive_query_events():
+    """Verify that registered hooks get an event for every statement."""
+    events = []
+    instrumentation.register(events.append)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("select %s, %s", [1, 2])
+            cursor.executemany("select %s", [[1], [2], [3]])
+    finally:
+        instrumentation.unregister(events.append)
+
+    assert len(events) == 2
+    assert events[0].sql == "select ?, ?"
+    assert events[0].param_count == 2
+    assert events[0].rowcount == 1
+    assert events[0].duration >= 0
+    assert events[0].wall_time > 0
+    assert events[0].payload_bytes == len(
+        b'{"stmt":"select ?, ?","args":[1,2]}'
+    )
+
+    assert events[1].many
+    assert events[1].param_count == 3
+
+    # Once unregistered, no more events are emitted.
+    with connection.cursor() as cursor:
+        cursor.execute("select 1")
+    assert len(events) == 2
+
+
+def test_latency_histogram():
+    histogram = instrumentation.LatencyHistogram(buckets=(10, 100))
+    for wall_time in (0.001, 0.05, 0.05, 1):
+        histogram(
+            instrumentation.QueryEvent(
+                sql="select 1",
+                params=None,
+                param_count=0,
+                wall_time=wall_time,
+                rowcount=1,
+                duration=1,
+            )
+        )
+    assert histogram.count == 4
+    assert histogram.snapshot() == {10: 1, 100: 3, float("inf"): 4}
+    assert histogram.percentile(0.5) == 100
+    assert histogram.percentile(1) == float("inf")
+
+
+def test_slow_query_log(caplog):
+    instrumentation.register(
+        hook := instrumentation.SlowQueryLog(threshold_ms=0)
+    )
+    try:
+        with caplog.at_level(logging.WARNING, logger="cratedb_django"):
+            with connection.cursor() as cursor:
+                cursor.execute("select 1")
+    finally:
+        instrumentation.unregister(hook)
+
+    assert "Slow query" in caplog.text
+    assert "select 1" in caplog.text
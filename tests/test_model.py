@@ -1,15 +1,35 @@
+import datetime
+
 import pytest
 
 from cratedb_django.models import CrateModel
 from cratedb_django.models.model import CRATE_META_OPTIONS, OMITTED
 from cratedb_django import fields
+from cratedb_django.models import estimate, functions
 
+from django.core.signals import request_finished
 from django.forms.models import model_to_dict
 from django.db import connection
+from django.db.models import Avg, Count, F
+from django.db.models.functions import ExtractHour, ExtractWeekDay, TruncDay
 from django.test.utils import CaptureQueriesContext
 
 from tests.utils import captured_queries
-from tests.test_app.models import AllFieldsModel, SimpleModel, RefreshModel
+from tests.test_app.models import (
+    AllFieldsModel,
+    DeleteChild,
+    DeleteNote,
+    DeleteParent,
+    EstimatedCountModel,
+    EventModel,
+    FulltextModel,
+    LazyRefreshModel,
+    PartitionedLazyRefreshModel,
+    SimpleModel,
+    RefreshModel,
+    TimeSeriesModel,
+    VectorModel,
+)
 
 
 def test_model_refresh():
@@ -326,3 +346,600 @@ def test_index_off():
             SomeModel, SomeModel._meta.get_field("f3")
         )
         assert sql == "integer INDEX OFF NOT NULL"
+
+
+def test_fulltext_index():
+    """Verify the fulltext indexes of fields and of Meta.fulltext_indexes."""
+
+    class SomeModel(CrateModel):
+        f1 = fields.TextField(fulltext=True)
+        f2 = fields.TextField(fulltext="english")
+
+        class Meta:
+            app_label = "_crate_test"
+            fulltext_indexes = {"f_ft": {"fields": ["f1", "f2"]}}
+
+    with connection.schema_editor() as schema_editor:
+        sql, params = schema_editor.column_sql(
+            SomeModel, SomeModel._meta.get_field("f1")
+        )
+        assert sql == "text INDEX USING FULLTEXT NOT NULL"
+        sql, params = schema_editor.column_sql(
+            SomeModel, SomeModel._meta.get_field("f2")
+        )
+        assert sql == (
+            "text INDEX USING FULLTEXT WITH (analyzer = 'english') NOT NULL"
+        )
+        sql, params = schema_editor.table_sql(SomeModel)
+        assert sql.endswith(', INDEX "f_ft" USING FULLTEXT ("f1", "f2"))')
+
+    with pytest.raises(ValueError, match="analyzer"):
+        fields.TextField(fulltext="english'")
+
+
+def test_bulk_create():
+    """Verify that bulk_create sends one statement with bulk_args and
+    reports the result of every row."""
+    with CaptureQueriesContext(connection) as ctx:
+        objs = SimpleModel.objects.bulk_create(
+            [SimpleModel(field=str(i)) for i in range(3)]
+        )
+        assert len(ctx.captured_queries) == 1
+        assert ctx.captured_queries[0]["sql"] == (
+            '3 times: INSERT INTO "test_app_simplemodel" ("field") VALUES (%s)'
+        )
+
+    assert len(objs) == 3
+    assert objs.report.rowcounts == [1, 1, 1]
+    assert objs.report.ok
+
+    SimpleModel.refresh()
+    assert SimpleModel.objects.count() == 3
+
+
+def test_bulk_create_report_failures():
+    """Rows that fail, e.g. with a duplicated primary key, are reported
+    with a -2 rowcount instead of raising."""
+
+    objs = SimpleModel.objects.bulk_create(
+        [SimpleModel(id="same", field=str(i)) for i in range(2)]
+    )
+    assert objs.report.rowcounts == [1, -2]
+    assert objs.report.failed == [1]
+    assert objs.report.rowcount == 1
+
+
+def test_bulk_update():
+    """Verify that bulk_update sends one UPDATE by primary key with
+    bulk_args and reports the result of every row."""
+    objs = SimpleModel.objects.bulk_create(
+        [SimpleModel(id=f"id{i}", field=str(i)) for i in range(3)]
+    )
+    SimpleModel.refresh()
+    for obj in objs:
+        obj.field += "x"
+    missing = SimpleModel(id="missing", field="x")
+
+    with CaptureQueriesContext(connection) as ctx:
+        updated = SimpleModel.objects.bulk_update([*objs, missing], ["field"])
+        assert len(ctx.captured_queries) == 1
+        assert ctx.captured_queries[0]["sql"] == (
+            '4 times: UPDATE "test_app_simplemodel" SET "field" = %s '
+            'WHERE "id" = %s'
+        )
+
+    assert updated == 3
+    assert updated.report.rowcounts == [1, 1, 1, 0]
+    SimpleModel.refresh()
+    assert sorted(SimpleModel.objects.values_list("field", flat=True)) == [
+        "0x",
+        "1x",
+        "2x",
+    ]
+
+
+def test_iterator_keyset_pagination():
+    """Verify that iterator(chunk_size) fetches every chunk with its own
+    keyset paginated query."""
+    SimpleModel.objects.bulk_create(
+        [SimpleModel(id=f"id{i}", field=str(i)) for i in range(5)]
+    )
+    SimpleModel.refresh()
+
+    with CaptureQueriesContext(connection) as ctx:
+        objs = list(SimpleModel.objects.iterator(chunk_size=2))
+        assert [obj.id for obj in objs] == [f"id{i}" for i in range(5)]
+        assert len(ctx.captured_queries) == 3
+        assert "LIMIT 2" in ctx.captured_queries[-1]["sql"]
+        assert (
+            '"test_app_simplemodel"."id" >' in ctx.captured_queries[-1]["sql"]
+        )
+
+    ids = SimpleModel.objects.values_list("id", flat=True)
+    assert list(ids.iterator(chunk_size=2, key="-id")) == [
+        f"id{i}" for i in reversed(range(5))
+    ]
+
+    assert [
+        obj.id
+        for obj in SimpleModel.objects.order_by("-pk").iterator(chunk_size=2)
+    ] == [f"id{i}" for i in reversed(range(5))]
+
+    with pytest.raises(ValueError, match="has to be selected"):
+        SimpleModel.objects.values("field").iterator(chunk_size=2)
+
+
+def test_columnar_export():
+    """Verify that querysets are exported in columns, typed from the fields."""
+    pa = pytest.importorskip("pyarrow")
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("numpy")
+
+    SimpleModel.objects.bulk_create(
+        [SimpleModel(id=f"id{i}", field=str(i)) for i in range(5)]
+    )
+    SimpleModel.refresh()
+    queryset = SimpleModel.objects.order_by("id")
+
+    table = queryset.to_arrow()
+    assert table.column_names == ["id", "field"]
+    assert table.schema.field("field").type == pa.string()
+    assert table.column("id").to_pylist() == [f"id{i}" for i in range(5)]
+
+    arrays = queryset.values("field").to_numpy()
+    assert list(arrays["field"]) == [str(i) for i in range(5)]
+
+    df = queryset.to_pandas()
+    assert isinstance(df, pd.DataFrame)
+    assert len(df) == 5
+
+    with CaptureQueriesContext(connection) as ctx:
+        chunks = list(queryset.to_pandas(chunk_size=2))
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+        assert len(ctx.captured_queries) == 3
+
+
+def test_copy_from():
+    """Verify the COPY FROM statement and its summary report."""
+    with CaptureQueriesContext(connection) as ctx:
+        report = SimpleModel.copy_from(
+            "file:///nonexistent/*.json", columns=["field"], bulk_size=100
+        )
+        assert (
+            'COPY "test_app_simplemodel" ("field") FROM %s '
+            "WITH (bulk_size = %s) RETURN SUMMARY"
+        ) in ctx.captured_queries[0]["sql"]
+    assert report.files == []
+    assert report.ok
+
+    with pytest.raises(ValueError, match="format"):
+        SimpleModel.copy_from("/data/a.parquet", format="parquet")
+    with pytest.raises(ValueError, match="partition column"):
+        SimpleModel.copy_from("/data/a.json", partition={"field": "a"})
+    with pytest.raises(ValueError, match="absolute path"):
+        SimpleModel.copy_from("data/a.json")
+
+
+def test_copy_to():
+    """Verify that querysets are exported with COPY TO DIRECTORY."""
+    SimpleModel.objects.bulk_create(
+        [SimpleModel(id=f"id{i}", field=str(i)) for i in range(3)]
+    )
+    SimpleModel.refresh()
+
+    queryset = SimpleModel.objects.filter(field__in=["0", "1"]).values("field")
+    with CaptureQueriesContext(connection) as ctx:
+        report = queryset.copy_to("/tmp/test_copy_to", compression="gzip")
+        assert (
+            'COPY "test_app_simplemodel" ("field") WHERE '
+            '"test_app_simplemodel"."field" = ANY(%s) TO DIRECTORY %s '
+            "WITH (compression = %s)"
+        ) in ctx.captured_queries[0]["sql"]
+    assert report.rowcount == 2
+
+    assert SimpleModel.objects.none().copy_to("/tmp/test_copy_to").rowcount == 0
+    with pytest.raises(ValueError, match="format"):
+        SimpleModel.objects.copy_to("/tmp/test_copy_to", format="csv")
+    with pytest.raises(ValueError, match="absolute path"):
+        SimpleModel.objects.none().copy_to("test_copy_to")
+
+
+def test_lazy_refresh():
+    """Verify that with auto_refresh="lazy" writes mark the table dirty and
+    it is refreshed once, before the next read."""
+    table = "test_app_lazyrefreshmodel"
+    with CaptureQueriesContext(connection) as ctx:
+        for i in range(3):
+            LazyRefreshModel.objects.create(field=str(i))
+        LazyRefreshModel.objects.filter(field="0").update(field="x")
+        assert set(connection.dirty_tables) == {table}
+        assert not any("REFRESH" in q["sql"] for q in ctx.captured_queries)
+
+        assert LazyRefreshModel.objects.count() == 3
+        refreshes = [q for q in ctx.captured_queries if "REFRESH" in q["sql"]]
+        assert len(refreshes) == 1
+        assert not connection.dirty_tables
+
+        # Other tables are not refreshed.
+        LazyRefreshModel.objects.filter(field="x").delete()
+        SimpleModel.objects.count()
+        assert set(connection.dirty_tables) == {table}
+
+    request_finished.send(sender=None)
+    assert not connection.dirty_tables
+    assert LazyRefreshModel.objects.count() == 2
+
+
+def test_lazy_refresh_exports():
+    """Verify that columnar exports and COPY TO refresh the dirty tables
+    they read."""
+    for i in range(3):
+        LazyRefreshModel.objects.create(field=str(i))
+    assert connection.dirty_tables
+
+    report = LazyRefreshModel.objects.copy_to("/tmp/test_lazy_refresh")
+    assert report.rowcount == 3
+    assert not connection.dirty_tables
+
+    pytest.importorskip("numpy")
+    LazyRefreshModel.objects.create(field="3")
+    assert len(LazyRefreshModel.objects.to_numpy()["field"]) == 4
+    assert not connection.dirty_tables
+
+
+def test_partition_refresh():
+    """Verify that only the partitions written to are refreshed."""
+    table = "test_app_partitionedlazyrefreshmodel"
+    with CaptureQueriesContext(connection) as ctx:
+        PartitionedLazyRefreshModel.objects.create(field="a", day=1)
+        PartitionedLazyRefreshModel.objects.bulk_create(
+            [
+                PartitionedLazyRefreshModel(field="b", day=2),
+                PartitionedLazyRefreshModel(field="c", day=1),
+            ]
+        )
+        assert connection.dirty_tables == {
+            table: {(("day", 1),), (("day", 2),)}
+        }
+
+        assert PartitionedLazyRefreshModel.objects.count() == 3
+        refresh = [q for q in ctx.captured_queries if "REFRESH" in q["sql"]]
+        assert (
+            f'REFRESH TABLE "{table}" PARTITION ("day" = %s), '
+            f'"{table}" PARTITION ("day" = %s)'
+        ) in refresh[0]["sql"]
+
+    # Updates can move rows to other partitions, the table is refreshed.
+    PartitionedLazyRefreshModel.objects.filter(field="a").update(day=3)
+    assert connection.dirty_tables == {table: None}
+    PartitionedLazyRefreshModel.refresh()
+    assert not connection.dirty_tables
+
+    PartitionedLazyRefreshModel.objects.create(field="d", day=4)
+    PartitionedLazyRefreshModel.refresh([{"day": 4}])
+    assert not connection.dirty_tables
+    with pytest.raises(ValueError, match="partition column"):
+        PartitionedLazyRefreshModel.refresh([{"field": "a"}])
+
+
+def test_in_lookup_any():
+    """Verify that __in lookups are sent as `= ANY(%s)` with one array."""
+    SimpleModel.objects.bulk_create(
+        [SimpleModel(id=f"id{i}", field=str(i)) for i in range(5)]
+    )
+    SimpleModel.refresh()
+
+    with CaptureQueriesContext(connection) as ctx:
+        for values in (["0"], ["1", "2", None], [str(i) for i in range(100)]):
+            SimpleModel.objects.filter(field__in=values).count()
+    statements = {q["sql"].split(" - PARAMS")[0] for q in ctx.captured_queries}
+    assert len(statements) == 1
+    assert '"test_app_simplemodel"."field" = ANY(%s)' in statements.pop()
+
+    assert SimpleModel.objects.filter(field__in=["1", "2", None]).count() == 2
+    assert SimpleModel.objects.filter(field__in=[None]).count() == 0
+    assert SimpleModel.objects.exclude(pk__in=["id0", "id1"]).count() == 3
+    SimpleModel.objects.filter(pk__in=["id3", "id4"]).delete()
+    SimpleModel.refresh()
+    assert SimpleModel.objects.count() == 3
+
+
+def test_delete_without_collector():
+    """Verify that deletes filter related rows with a subquery instead of
+    selecting the rows first."""
+    DeleteParent.objects.bulk_create(
+        [DeleteParent(id=f"p{i}", day=i) for i in range(3)]
+    )
+    DeleteChild.objects.bulk_create(
+        [DeleteChild(id=f"c{i}", parent_id=f"p{i}") for i in range(3)]
+    )
+    DeleteNote.objects.bulk_create(
+        [DeleteNote(id=f"n{i}", child_id=f"c{i}") for i in range(3)]
+    )
+    for model in (DeleteParent, DeleteChild, DeleteNote):
+        model.refresh()
+
+    with CaptureQueriesContext(connection) as ctx:
+        deleted = DeleteParent.objects.filter(day__lt=2).delete()
+        assert deleted == (
+            4,
+            {"test_app.DeleteChild": 2, "test_app.DeleteParent": 2},
+        )
+        statements = [q["sql"] for q in ctx.captured_queries]
+        assert not any(sql.startswith("QUERY = 'SELECT") for sql in statements)
+        assert statements[0].startswith(
+            'QUERY = \'UPDATE "test_app_deletenote"'
+        )
+
+    for model in (DeleteParent, DeleteChild, DeleteNote):
+        model.refresh()
+    assert list(DeleteChild.objects.values_list("id", flat=True)) == ["c2"]
+    assert DeleteNote.objects.filter(child__isnull=True).count() == 2
+
+    parent = DeleteParent.objects.get(id="p2")
+    assert parent.delete() == (
+        2,
+        {"test_app.DeleteChild": 1, "test_app.DeleteParent": 1},
+    )
+    assert parent.pk is None
+
+
+def test_aggregates():
+    """Verify the approximate and statistical aggregates, with and without
+    GROUP BY."""
+    DeleteParent.objects.bulk_create(
+        [DeleteParent(id=f"agg{i}", day=i % 2 + 1) for i in range(10)]
+    )
+    DeleteParent.refresh()
+    queryset = DeleteParent.objects.filter(id__startswith="agg")
+
+    result = queryset.aggregate(
+        distinct=functions.HyperLogLogDistinct("day"),
+        precise=functions.HyperLogLogDistinct("day", precision=18),
+        median=functions.Percentile("day", 0.5),
+        percentiles=functions.Percentile("day", [0.0, 1.0]),
+        top=functions.TopK("day", 1),
+        stddev=functions.StdDev("day"),
+        variance=functions.Variance("day", sample=True),
+        mean=functions.GeometricMean("day"),
+    )
+    assert result["distinct"] == result["precise"] == 2
+    assert 1 <= result["median"] <= 2
+    assert result["percentiles"] == [1.0, 2.0]
+    assert len(result["top"]) == 1
+    assert result["top"][0]["frequency"] == 5
+    assert result["stddev"] == pytest.approx(0.5)
+    assert result["variance"] == pytest.approx(0.25 * 10 / 9)
+    assert result["mean"] == pytest.approx(2**0.5)
+
+    rows = queryset.values("day").annotate(
+        n=functions.HyperLogLogDistinct("id"),
+        p=functions.Percentile("day", 0.5),
+    )
+    assert sorted((row["day"], row["n"], row["p"]) for row in rows) == [
+        (1, 5, 1.0),
+        (2, 5, 2.0),
+    ]
+
+
+def test_estimated_count():
+    """Verify that counts are summed from sys.shards, only over the matching
+    partitions, and that other filters are counted exactly."""
+    EstimatedCountModel.objects.bulk_create(
+        [
+            EstimatedCountModel(field=str(i), day=1 if i < 3 else 2)
+            for i in range(5)
+        ]
+    )
+    EstimatedCountModel.refresh()
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert EstimatedCountModel.objects.count() == 5
+        assert EstimatedCountModel.objects.filter(day=1).count() == 3
+        assert EstimatedCountModel.objects.filter(day__in=[2, 3]).count() == 2
+        assert all("sys.shards" in q["sql"] for q in ctx.captured_queries)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert EstimatedCountModel.objects.filter(field="1").count() == 1
+        assert EstimatedCountModel.objects.filter(day__in=[]).count() == 0
+        assert "COUNT(*)" in ctx.captured_queries[0]["sql"]
+        assert len(ctx.captured_queries) == 1
+
+    PartitionedLazyRefreshModel.objects.create(field="a", day=1)
+    assert PartitionedLazyRefreshModel.objects.estimated_count() == 1
+
+
+def test_estimated_count_partition_options():
+    """Verify that partition values are cast to the bare column type,
+    without column options like INDEX OFF."""
+
+    class Partitioned(CrateModel):
+        day = fields.IntegerField(db_index=False)
+
+        class Meta:
+            app_label = "_crate_test"
+            partition_by = ["day"]
+
+    sql, params = estimate.estimated_count_sql(
+        Partitioned.objects.filter(day=1)
+    )
+    assert 'CAST("values"[\'day\'] AS integer) AS "day"' in sql
+    assert "INDEX" not in sql
+    assert params[-1] == 1
+
+
+def test_time_buckets():
+    """Verify Trunc, Extract, DateBin and downsample()."""
+    start = datetime.datetime(2024, 1, 6, 23, 50, tzinfo=datetime.timezone.utc)
+    TimeSeriesModel.objects.bulk_create(
+        [
+            TimeSeriesModel(
+                ts=start + datetime.timedelta(minutes=5 * i),
+                sensor=sensor,
+                value=i,
+            )
+            for i in range(6)
+            for sensor in ("a", "b")
+        ]
+    )
+    TimeSeriesModel.refresh()
+
+    days = (
+        TimeSeriesModel.objects.annotate(
+            day=TruncDay("ts", tzinfo=datetime.timezone.utc),
+            hour=ExtractHour("ts", tzinfo=datetime.timezone.utc),
+            week_day=ExtractWeekDay("ts", tzinfo=datetime.timezone.utc),
+        )
+        .values("day", "hour", "week_day")
+        .annotate(n=Count("id"))
+        .order_by("day")
+    )
+    assert list(days) == [
+        {
+            "day": datetime.datetime(2024, 1, 6, tzinfo=datetime.timezone.utc),
+            "hour": 23,
+            # Saturday.
+            "week_day": 7,
+            "n": 4,
+        },
+        {
+            "day": datetime.datetime(2024, 1, 7, tzinfo=datetime.timezone.utc),
+            "hour": 0,
+            # Sunday.
+            "week_day": 1,
+            "n": 8,
+        },
+    ]
+
+    buckets = TimeSeriesModel.objects.downsample(
+        datetime.timedelta(minutes=15), "ts", by=["sensor"], value=Avg("value")
+    )
+    assert [
+        (row["bucket"].time(), row["sensor"], row["value"]) for row in buckets
+    ] == [
+        (datetime.time(23, 45), "a", 0.5),
+        (datetime.time(23, 45), "b", 0.5),
+        (datetime.time(0, 0), "a", 3.0),
+        (datetime.time(0, 0), "b", 3.0),
+        (datetime.time(0, 15), "a", 5.0),
+        (datetime.time(0, 15), "b", 5.0),
+    ]
+
+
+def test_knn_search():
+    """Verify the nearest neighbour search of FloatVectorField."""
+    VectorModel.objects.bulk_create(
+        [
+            VectorModel(name="x", embedding=[1, 0, 0]),
+            VectorModel(name="y", embedding=[0, 1, 0]),
+            VectorModel(name="xy", embedding=[0.9, 0.4, 0]),
+        ]
+    )
+    VectorModel.refresh()
+
+    query = [1.0, 0.1, 0.0]
+    nearest = (
+        VectorModel.objects.filter(functions.KnnMatch("embedding", query, 2))
+        .annotate(similarity=functions.VectorSimilarity("embedding", query))
+        .order_by("-similarity")[:2]
+    )
+    assert [obj.name for obj in nearest] == ["x", "xy"]
+    assert 0 < nearest[1].similarity < nearest[0].similarity <= 1
+    assert VectorModel.objects.get(name="y").embedding == [0.0, 1.0, 0.0]
+    # float_vector columns are read back as lists of floats.
+    embeddings = VectorModel.objects.order_by("name").values_list(
+        "embedding", flat=True
+    )
+    assert [pytest.approx(e) for e in embeddings] == [
+        [1.0, 0.0, 0.0],
+        [0.9, 0.4, 0.0],
+        [0.0, 1.0, 0.0],
+    ]
+
+
+def test_fulltext_search():
+    """Verify the match lookup and the Match and Score expressions."""
+    FulltextModel.objects.bulk_create(
+        [
+            FulltextModel(title="Quick foxes", body="They jump"),
+            FulltextModel(title="Lazy dogs", body="A quick nap"),
+            FulltextModel(title="Birds", body="They fly"),
+        ]
+    )
+    FulltextModel.refresh()
+
+    # The english analyzer stems "foxes" to "fox".
+    assert list(
+        FulltextModel.objects.filter(title__match="fox").values_list(
+            "title", flat=True
+        )
+    ) == ["Quick foxes"]
+
+    ranked = (
+        FulltextModel.objects.filter(
+            functions.Match({"title": 2, "body": None}, "quick")
+        )
+        .annotate(score=functions.Score())
+        .order_by("-score")
+    )
+    assert [obj.title for obj in ranked] == ["Quick foxes", "Lazy dogs"]
+    assert ranked[0].score > ranked[1].score
+
+    assert (
+        FulltextModel.objects.filter(
+            functions.Match("title_body_ft", "fly birds", operator="and")
+        ).count()
+        == 1
+    )
+    assert (
+        FulltextModel.objects.filter(
+            functions.Match("title", "dgos", fuzziness=2)
+        ).count()
+        == 1
+    )
+    # Two of the three terms have to match.
+    assert (
+        FulltextModel.objects.filter(
+            functions.Match(
+                "title_body_ft", "quick nap birds", minimum_should_match="75%"
+            )
+        ).count()
+        == 1
+    )
+
+
+def test_object_keys():
+    """Verify that object keys are sub-columns in filters, values, order_by
+    and annotations, typed by the strict schema."""
+    EventModel.objects.bulk_create(
+        [
+            EventModel(
+                payload={"device": {"id": f"d{i % 2}"}, "level": i},
+                stats={"count": i, "device": {"id": f"s{i}"}},
+            )
+            for i in range(4)
+        ]
+    )
+    EventModel.refresh()
+
+    events = EventModel.objects.filter(payload__device__id="d1")
+    assert "\"payload\"['device']['id'] = " in str(events.query)
+    assert events.count() == 2
+
+    assert list(
+        EventModel.objects.values("payload__device__id")
+        .annotate(n=Count("id"))
+        .order_by("payload__device__id")
+    ) == [
+        {"payload__device__id": "d0", "n": 2},
+        {"payload__device__id": "d1", "n": 2},
+    ]
+
+    # The schema declares an integer, "2" is prepared as 2.
+    assert list(
+        EventModel.objects.filter(stats__count__gte="2")
+        .annotate(device=F("stats__device__id"))
+        .order_by("-stats__count")
+        .values_list("device", flat=True)
+    ) == ["s3", "s2"]
+    assert EventModel.objects.filter(payload__level__isnull=False).count() == 4
@@ -0,0 +1,100 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    NotSupportedError,
+    connection,
+    connections,
+)
+
+psycopg = pytest.importorskip("psycopg")
+
+from cratedb_django.postgres.base import DatabaseWrapper  # noqa: E402
+from cratedb_django.postgres.base import PGCursor  # noqa: E402
+from cratedb_django.postgres.base import PGServerCursor  # noqa: E402
+
+# Imported so `clean_database` deletes the inserted rows.
+from tests.test_app.models import SimpleModel  # noqa: E402
+
+
+@pytest.fixture
+def pg_connection():
+    """A connection to the PostgreSQL wire protocol port of the test database."""
+    settings_dict = dict(connection.settings_dict)
+    settings_dict.update(
+        {
+            "ENGINE": "cratedb_django.postgres",
+            "HOST": "localhost",
+            "PORT": 5432,
+            "OPTIONS": {},
+        }
+    )
+    wrapper = DatabaseWrapper(settings_dict, alias="postgres")
+    yield wrapper
+    wrapper.close()
+
+
+def test_get_connection_params(pg_connection):
+    params = pg_connection.get_connection_params()
+    assert params["host"] == "localhost"
+    assert params["port"] == 5432
+    assert params["user"] == "crate"
+    assert params["dbname"] == "doc"
+
+    pg_connection.settings_dict["OPTIONS"] = {
+        "binary_parameters": False,
+        "connect_timeout": 5,
+    }
+    params = pg_connection.get_connection_params()
+    assert "binary_parameters" not in params
+    assert params["connect_timeout"] == 5
+
+    pg_connection.settings_dict["OPTIONS"] = {"statement_timeout": 5}
+    with pytest.raises(ImproperlyConfigured, match="statement_timeout"):
+        pg_connection.get_connection_params()
+
+
+def test_timeout_not_supported(pg_connection, monkeypatch):
+    """Verify that querysets cannot get a timeout that would be ignored."""
+    monkeypatch.setitem(connections, DEFAULT_DB_ALIAS, pg_connection)
+    with pytest.raises(NotSupportedError):
+        SimpleModel.objects.timeout(5)
+
+
+def test_binary_insert_parameters(pg_connection):
+    """Verify that only the placeholders of inserts are made binary."""
+    with pg_connection.cursor() as cursor:
+        assert isinstance(cursor.cursor, PGCursor)
+        assert (
+            cursor.cursor.convert_query("INSERT INTO t VALUES (%s, '%%s')")
+            == "INSERT INTO t VALUES (%b, '%%s')"
+        )
+        assert cursor.cursor.convert_query("SELECT %s") == "SELECT %s"
+
+        cursor.executemany(
+            'INSERT INTO "test_app_simplemodel" ("id", "field") VALUES (%s, %s)',
+            ((f"id{i}", str(i)) for i in range(3)),
+        )
+        assert cursor.rowcount == 3
+
+
+def test_bulk_create(pg_connection, monkeypatch):
+    """Verify that multi row inserts work with psycopg's executemany."""
+    monkeypatch.setitem(connections, DEFAULT_DB_ALIAS, pg_connection)
+    objs = SimpleModel.objects.bulk_create(
+        [SimpleModel(id=f"id{i}", field=str(i)) for i in range(3)]
+    )
+    assert len(objs) == 3
+    assert objs.report.failed == []
+    SimpleModel.refresh()
+    assert SimpleModel.objects.count() == 3
+
+
+def test_chunked_cursor_streams(pg_connection):
+    """Verify that chunked reads use a server-side cursor."""
+    assert pg_connection.features.can_use_chunked_reads
+    with pg_connection.chunked_cursor() as cursor:
+        assert isinstance(cursor.cursor, PGServerCursor)
+        cursor.execute("SELECT * FROM generate_series(1, 10)")
+        assert cursor.fetchmany(3) == [(1,), (2,), (3,)]
+        assert cursor.fetchmany(3) == [(4,), (5,), (6,)]